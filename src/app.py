@@ -29,7 +29,10 @@ class App(ctk.CTk):
         self.shared_state = {
             "file_a": None,
             "file_b": None,
+            "sheets_a": None,
+            "sheets_b": None,
             "threshold": 0.75,
+            "model": None,
             "result": None,
         }
 
@@ -41,22 +44,26 @@ class App(ctk.CTk):
 
         # 创建页面
         self.pages = {}
-        self.pages["import"] = PageImport(self._container, self.shared_state, self.show_page)
+        self.pages["import"] = PageImport(
+            self._container, self.shared_state, self.show_page, self.get_page
+        )
         self.pages["import"].grid(row=0, column=0, sticky="nsew")
 
         # 显示初始页面
         self.current_page = None
         self.show_page("import")
 
-    def show_page(self, page_name):
-        """切换页面（lift 方式，无布局重算）"""
-        # 延迟创建 result 页面
+    def get_page(self, page_name):
+        """获取页面（result 页面延迟创建）"""
         if page_name == "result" and page_name not in self.pages:
             self.pages["result"] = PageResult(self._container, self.shared_state, self.show_page)
             self.pages["result"].grid(row=0, column=0, sticky="nsew")
+        return self.pages[page_name]
 
+    def show_page(self, page_name):
+        """切换页面（lift 方式，无布局重算）"""
         self.current_page = page_name
-        page = self.pages[page_name]
+        page = self.get_page(page_name)
 
         if hasattr(page, "on_show"):
             page.on_show()
@@ -0,0 +1,235 @@
+"""VLookup Pro - 命令行入口
+
+用法:
+    python -m src.cli match A.xlsx "B/*.xlsx" --sheets-b "*" --save-session out.vlps --export out.xlsx
+    python -m src.cli session out.vlps --threshold 0.8 --sweep --export out.xlsx
+    python -m src.cli models --register catalog D:/models/catalog-bge
+    python -m src.cli benchmark pairs.xlsx --models bge-base-zh,bge-small-zh,catalog
+    python -m src.cli evaluate A.xlsx B.xlsx gold.xlsx --model bge-small-zh
+"""
+
+import sys
+import os
+import time
+import argparse
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.matcher import run_match, export_result, rethreshold, threshold_sweep
+from src.core.match_result import STATUS_EXACT, STATUS_FUZZY, STATUS_UNMATCHED
+from src.core.session import save_session, load_session
+from src.core.model_manager import (
+    DEFAULT_MODEL, list_models, is_model_available, register_model, unregister_model,
+)
+
+
+def _print_summary(result):
+    counts = result.counts()
+    print(
+        f"A表: {len(result.a_items)} 项  |  B表: {len(result.b_items)} 项  |  "
+        f"精确: {counts[STATUS_EXACT]}  模糊: {counts[STATUS_FUZZY]}  "
+        f"未匹配: {counts[STATUS_UNMATCHED]}  B表未使用: {len(result.unmatched_b_idx)}"
+    )
+    capped = (result.scoring or {}).get("capped", 0)
+    if capped:
+        print(f"注意: {capped} 个 A 项的 AI 候选被 --top-k 截断，模糊匹配可能少于完整计算")
+
+
+def _print_sweep(result):
+    sweep = threshold_sweep(result)
+    print("阈值    模糊匹配    未匹配")
+    for t, n_fuzzy, n_unmatched in zip(sweep["thresholds"], sweep["fuzzy"], sweep["unmatched"]):
+        print(f"{t:.2f}  {n_fuzzy:>8}  {n_unmatched:>8}")
+
+
+def _cmd_match(args):
+    start = time.perf_counter()
+    result = run_match(
+        args.file_a,
+        args.file_b,
+        threshold=args.threshold,
+        progress_callback=print,
+        sheets_a=args.sheets_a,
+        sheets_b=args.sheets_b,
+        model_name=args.model,
+        candidate_top_k=args.top_k,
+        candidate_floor=args.floor,
+    )
+    print(f"耗时 {time.perf_counter() - start:.1f} 秒")
+    _print_summary(result)
+    if args.sweep:
+        _print_sweep(result)
+
+    if args.save_session:
+        print(f"会话已保存: {save_session(result, args.save_session)}")
+    if args.export:
+        export_result(result, args.export)
+        print(f"已导出: {args.export}")
+
+
+def _cmd_session(args):
+    start = time.perf_counter()
+    result = load_session(args.path)
+    print(f"加载耗时 {time.perf_counter() - start:.2f} 秒")
+    if args.threshold is not None:
+        result = rethreshold(result, args.threshold)
+    _print_summary(result)
+    if args.sweep:
+        _print_sweep(result)
+    if args.save_session:
+        print(f"会话已保存: {save_session(result, args.save_session)}")
+
+    if args.export:
+        export_result(result, args.export)
+        print(f"已导出: {args.export}")
+
+
+def _cmd_models(args):
+    if args.register:
+        register_model(*args.register)
+    if args.unregister:
+        unregister_model(args.unregister)
+    for name, source in list_models().items():
+        mark = "*" if name == DEFAULT_MODEL else " "
+        note = "" if is_model_available(name) else "  （本机不可用）"
+        print(f"{mark} {name:<20} {source}{note}")
+
+
+def _cmd_benchmark(args):
+    from src.core.benchmark import benchmark_models
+
+    names = [n.strip() for n in args.models.split(",")] if args.models else None
+    reports = benchmark_models(args.pairs, names, progress_callback=print)
+
+    def fmt(value, spec):
+        return "-" if value is None else format(value, spec)
+
+    print(f"{'模型':<20}{'维度':>6}{'加载(s)':>9}{'编码(s)':>9}{'条/秒':>9}{'Top1':>7}{'AUC':>7}{'最佳F1':>8}{'阈值':>7}")
+    for r in reports:
+        if "error" in r:
+            print(f"{r['model']:<20}  失败: {r['error']}")
+            continue
+        print(
+            f"{r['model']:<20}{r['dim']:>6}{r['load_s']:>9.1f}{r['encode_s']:>9.2f}"
+            f"{r['texts_per_s']:>9.0f}{fmt(r['top1'], '.3f'):>7}{fmt(r['auc'], '.3f'):>7}"
+            f"{fmt(r['best_f1'], '.3f'):>8}{fmt(r['best_threshold'], '.2f'):>7}"
+        )
+
+
+def _cmd_evaluate(args):
+    from src.core.evaluate import evaluate
+
+    report = evaluate(
+        args.file_a,
+        args.file_b,
+        args.gold,
+        threshold=args.threshold,
+        progress_callback=print,
+        sheets_a=args.sheets_a,
+        sheets_b=args.sheets_b,
+        model_name=args.model,
+        candidate_top_k=args.top_k,
+        candidate_floor=args.floor,
+    )
+
+    print(f"模型: {report['result']['model']}  阈值: {args.threshold}")
+    print(
+        f"标注 A 项: {report['labeled']}  其中应有匹配: {report['positives']}  "
+        f"不应匹配: {report['negatives']}"
+    )
+    print(f"耗时: {report['time_s']:.1f} 秒", end="")
+    if report["peak_rss_mb"] is not None:
+        print(f"  峰值内存: {report['peak_rss_mb']:.0f} MB")
+    else:
+        print()
+    for message, seconds in report["stages"]:
+        if seconds >= 0.05:
+            print(f"    {seconds:>7.2f}s  {message}")
+
+    print(f"\n{'状态':<10}{'数量':>8}{'正确':>8}{'P':>8}{'R':>8}{'F1':>8}")
+    for status, stats in report["by_status"].items():
+        print(
+            f"{status:<10}{stats['count']:>8}{stats['correct']:>8}{stats['precision']:>8.3f}"
+            f"{stats['recall']:>8.3f}{stats['f1']:>8.3f}"
+        )
+
+    overall = report["overall"]
+    print(f"\n总体  P={overall['precision']:.3f}  R={overall['recall']:.3f}  F1={overall['f1']:.3f}")
+
+    if report["by_threshold"]:
+        print(f"\n{'阈值':<8}{'模糊匹配':>8}{'P':>8}{'R':>8}{'F1':>8}")
+        for row in report["by_threshold"]:
+            print(
+                f"{row['threshold']:<8.2f}{row['fuzzy']:>8}{row['precision']:>8.3f}"
+                f"{row['recall']:>8.3f}{row['f1']:>8.3f}"
+            )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="vlookup-pro", description="VLookup Pro 命令行工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("match", help="执行匹配")
+    p.add_argument("file_a", help="Excel A（; 分隔多个路径或通配符）")
+    p.add_argument("file_b", help="Excel B（; 分隔多个路径或通配符）")
+    p.add_argument("--sheets-a", default=None, help="A 表工作表：* = 全部，或逗号分隔名称")
+    p.add_argument("--sheets-b", default=None, help="B 表工作表：* = 全部，或逗号分隔名称")
+    p.add_argument("--threshold", type=float, default=0.75, help="相似度阈值（默认 0.75）")
+    p.add_argument("--model", default=None, help=f"模型注册名（默认 {DEFAULT_MODEL}，见 models 命令）")
+    p.add_argument("--top-k", type=int, default=None,
+                   help="每个 A 项最多保留的 AI 候选数（限制内存，可能少配对；默认不限）")
+    p.add_argument("--floor", type=float, default=None,
+                   help="AI 候选保留下限，之后可把阈值调低到此值而不重新匹配（默认阈值 - 0.1）")
+    p.add_argument("--save-session", default=None, help="保存会话目录路径")
+    p.add_argument("--export", default=None, help="导出 Excel 路径")
+    p.add_argument("--sweep", action="store_true", help="输出各阈值下的匹配数")
+    p.set_defaults(func=_cmd_match)
+
+    p = sub.add_parser("session", help="打开已保存的会话")
+    p.add_argument("path", help="会话目录或其中的 session.json")
+    p.add_argument("--threshold", type=float, default=None, help="以新阈值重新配对（不重新编码）")
+    p.add_argument("--sweep", action="store_true", help="输出各阈值下的匹配数")
+    p.add_argument("--save-session", default=None, help="另存会话目录路径")
+    p.add_argument("--export", default=None, help="导出 Excel 路径")
+    p.set_defaults(func=_cmd_session)
+
+    p = sub.add_parser("models", help="列出/注册模型")
+    p.add_argument("--register", nargs=2, metavar=("NAME", "DIR"), help="注册本地模型目录")
+    p.add_argument("--unregister", metavar="NAME", help="取消注册本地模型")
+    p.set_defaults(func=_cmd_models)
+
+    p = sub.add_parser("benchmark", help="在标注文本对上比较模型速度和质量")
+    p.add_argument("pairs", help="标注文件：A 文本, B 文本[, 标签 1/0]（Excel 或 CSV）")
+    p.add_argument("--models", default=None, help="逗号分隔的模型注册名（默认全部）")
+    p.set_defaults(func=_cmd_benchmark)
+
+    p = sub.add_parser("evaluate", help="按标注的正确配对评测匹配流程（P/R/F1、耗时、内存）")
+    p.add_argument("file_a", help="Excel A（; 分隔多个路径或通配符）")
+    p.add_argument("file_b", help="Excel B（; 分隔多个路径或通配符）")
+    p.add_argument("gold", help="标注文件：A 文本, 正确的 B 文本（B 为空表示不应匹配）")
+    p.add_argument("--sheets-a", default=None, help="A 表工作表：* = 全部，或逗号分隔名称")
+    p.add_argument("--sheets-b", default=None, help="B 表工作表：* = 全部，或逗号分隔名称")
+    p.add_argument("--threshold", type=float, default=0.75, help="相似度阈值（默认 0.75）")
+    p.add_argument("--model", default=None, help=f"模型注册名（默认 {DEFAULT_MODEL}）")
+    p.add_argument("--top-k", type=int, default=None, help="每个 A 项最多保留的 AI 候选数（默认不限）")
+    p.add_argument("--floor", type=float, default=None,
+                   help="AI 候选保留下限，阈值扫描从此值开始（默认阈值 - 0.1）")
+    p.set_defaults(func=_cmd_evaluate)
+
+    return parser
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.WARNING)
+    args = build_parser().parse_args(argv)
+    try:
+        args.func(args)
+    except ValueError as e:
+        # 输入问题（阈值低于候选下限、工作表不存在等）只输出提示，不打印堆栈
+        print(f"错误: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-"""AI 语义匹配 - 使用 BAAI/bge-base-zh-v1.5 进行向量相似度匹配"""
+"""AI 语义匹配 - 使用注册表中的模型（默认 BAAI/bge-base-zh-v1.5）进行向量相似度匹配"""
 
 import threading
 import logging
@@ -6,24 +6,36 @@ import numpy as np
 
 logger = logging.getLogger(__name__)
 
-_model = None
+# 已加载模型：注册名 -> 模型，只保留最近使用的一个
+_models = {}
 _model_lock = threading.Lock()
 
+# 候选保留：相似度不低于 (阈值 - CANDIDATE_MARGIN) 的候选全部保留，
+# 结果页可在此范围内调低阈值而不必重新匹配
+CANDIDATE_MARGIN = 0.1
+# 分块计算相似度时每块的 A 行数
+SCORE_CHUNK_SIZE = 2048
 
-def _get_model():
-    """懒加载模型（线程安全，双重检查锁）"""
-    global _model
-    if _model is None:
+
+def _get_model(model_name=None):
+    """懒加载模型（线程安全，双重检查锁）；切换模型时先释放之前加载的模型"""
+    from .model_manager import DEFAULT_MODEL, load_model
+
+    name = model_name or DEFAULT_MODEL
+    model = _models.get(name)
+    if model is None:
         with _model_lock:
-            if _model is None:
-                from .model_manager import load_model
-                _model = load_model()
-    return _model
+            model = _models.get(name)
+            if model is None:
+                _models.clear()
+                model = load_model(name)
+                _models[name] = model
+    return model
 
 
-def encode_texts(texts):
+def encode_texts(texts, model_name=None):
     """将文本列表编码为归一化向量"""
-    model = _get_model()
+    model = _get_model(model_name)
     vectors = model.encode(texts, normalize_embeddings=True, show_progress_bar=False)
     return np.array(vectors)
 
@@ -33,46 +45,107 @@ def compute_similarity_matrix(vectors_a, vectors_b):
     return np.dot(vectors_a, vectors_b.T)
 
 
-def greedy_match(sim_matrix, threshold, a_items, b_items):
-    """贪心一对一匹配：按相似度降序，每项最多匹配一次
+def candidate_floor(threshold, floor=None):
+    """候选保留下限：默认比阈值低 CANDIDATE_MARGIN，且不高于阈值"""
+    if floor is None:
+        floor = threshold - CANDIDATE_MARGIN
+    return max(0.0, min(float(floor), float(threshold)))
+
+
+def _merge_sorted(parts):
+    """合并多组已按相似度降序排列的 (rows, cols, scores)；分数相同时靠前的组在前"""
+    if not parts:
+        empty = np.empty(0, dtype=np.int32)
+        return empty, empty.copy(), np.empty(0, dtype=np.float32)
+    while len(parts) > 1:
+        merged = []
+        for i in range(0, len(parts) - 1, 2):
+            x, y = parts[i], parts[i + 1]
+            pos = np.searchsorted(-x[2], -y[2], side="right")
+            merged.append(tuple(np.insert(xa, pos, ya) for xa, ya in zip(x, y)))
+        if len(parts) % 2:
+            merged.append(parts[-1])
+        parts = merged
+    return parts[0]
+
+
+def score_candidates(vectors_a, vectors_b, floor, top_k=None,
+                     chunk_size=SCORE_CHUNK_SIZE, progress_callback=None):
+    """分块计算相似度，保留不低于 floor 的全部候选（每块排序后归并）
 
     Args:
-        sim_matrix: shape (len(a_items), len(b_items)) 的相似度矩阵
-        threshold: 相似度阈值
-        a_items: A 表未匹配项列表
-        b_items: B 表未匹配项列表
+        top_k: 可选，每个 A 项最多保留的候选数（用于限制内存）。
+            截断后贪心配对可能比完整矩阵少配对，被截断的 A 项数会一并返回
 
     Returns:
-        list of (a_idx, b_idx, similarity) 匹配结果
+        (rows, cols, scores, n_capped)，前三项为 int32/int32/float32，按相似度降序排列；
+        n_capped 为候选数超过 top_k 而被截断的 A 项数（未设 top_k 时为 0）
     """
-    if sim_matrix.size == 0:
-        return []
+    n_b = len(vectors_b)
+    k = n_b if top_k is None else min(top_k, n_b)
+    n_capped = 0
+    parts = []
+
+    for start in range(0, len(vectors_a), chunk_size):
+        sim = compute_similarity_matrix(vectors_a[start:start + chunk_size], vectors_b)
+        if k < n_b:
+            n_capped += int(np.count_nonzero(np.count_nonzero(sim >= floor, axis=1) > k))
+            cols = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+            scores = np.take_along_axis(sim, cols, axis=1)
+            keep = scores >= floor
+            rows = np.broadcast_to(np.arange(start, start + len(sim))[:, None], cols.shape)
+            rows, cols, scores = rows[keep], cols[keep], scores[keep]
+        else:
+            rows, cols = np.nonzero(sim >= floor)
+            scores = sim[rows, cols]
+            rows = rows + start
+        order = np.argsort(-scores, kind="stable")
+        parts.append((
+            rows[order].astype(np.int32), cols[order].astype(np.int32), scores[order].astype(np.float32),
+        ))
+        if progress_callback:
+            done = min(start + chunk_size, len(vectors_a))
+            progress_callback(f"正在计算相似度候选 ({done}/{len(vectors_a)})...")
+
+    rows, cols, scores = _merge_sorted(parts)
+    return rows, cols, scores, n_capped
+
+
+def greedy_assign(rows, cols, scores, n_a, n_b):
+    """对已按相似度降序排列的候选做一次不设阈值的贪心一对一配对
+
+    贪心按降序处理候选，是否接受某个候选只取决于分数更高的候选，
+    因此任意阈值 t 下的贪心结果恰好是本结果中 score >= t 的前缀。
+    配对数达到 min(n_a, n_b) 后不可能再有新配对，提前结束。
 
-    # 找所有超过阈值的候选对
-    rows, cols = np.where(sim_matrix >= threshold)
-    scores = sim_matrix[rows, cols]
+    Returns:
+        (rows, cols, scores)，被接受的配对，按相似度降序排列
+    """
+    matched_a = bytearray(n_a)
+    matched_b = bytearray(n_b)
+    limit = min(n_a, n_b)
+    accepted = []
 
-    # 按相似度降序排序
-    order = np.argsort(-scores)
-    rows = rows[order]
-    cols = cols[order]
-    scores = scores[order]
+    for i, (r, c) in enumerate(zip(rows.tolist(), cols.tolist())):
+        if matched_a[r] or matched_b[c]:
+            continue
+        matched_a[r] = 1
+        matched_b[c] = 1
+        accepted.append(i)
+        if len(accepted) == limit:
+            break
 
-    matched_a = set()
-    matched_b = set()
-    matches = []
+    accepted = np.asarray(accepted, dtype=np.int64)
+    return rows[accepted], cols[accepted], scores[accepted]
 
-    for r, c, s in zip(rows, cols, scores):
-        if r in matched_a or c in matched_b:
-            continue
-        matches.append((int(r), int(c), float(s)))
-        matched_a.add(r)
-        matched_b.add(c)
 
-    return matches
+def cut_at_threshold(scores, threshold):
+    """已降序排列的配对中 score >= threshold 的前缀长度"""
+    return int(np.searchsorted(-scores, -np.float32(threshold), side="right"))
 
 
-def ai_match(a_texts, b_texts, threshold=0.85, progress_callback=None):
+def ai_match(a_texts, b_texts, threshold=0.85, progress_callback=None, return_details=False,
+             model_name=None, top_k=None, floor=None):
     """对两组文本进行 AI 语义匹配
 
     Args:
@@ -80,30 +153,58 @@ def ai_match(a_texts, b_texts, threshold=0.85, progress_callback=None):
         b_texts: B 表待匹配文本列表
         threshold: 相似度阈值
         progress_callback: 进度回调 fn(message)
+        return_details: 为 True 时同时返回向量和全部贪心配对（用于重新设置阈值/保存会话）
+        model_name: 模型注册名，None 表示默认模型
+        top_k: 可选，每个 A 项最多保留的候选数，见 score_candidates
+        floor: 候选保留下限，None 表示 threshold - CANDIDATE_MARGIN（见 candidate_floor）
 
     Returns:
-        list of (a_idx, b_idx, similarity)
+        list of (a_idx, b_idx, similarity)；
+        return_details=True 时返回 (matches, details)，details 包含
+            vectors_a, vectors_b: 两组向量
+            accepted: 不设阈值的贪心配对 (rows, cols, scores)，按相似度降序
+            floor: 候选保留下限，低于此值的阈值需要重新匹配
+            capped: 因 top_k 被截断候选的 A 项数
     """
     if not a_texts or not b_texts:
-        return []
+        return ([], None) if return_details else []
 
     if progress_callback:
         progress_callback("正在加载 AI 模型...")
 
     if progress_callback:
         progress_callback(f"正在编码 A 表文本 ({len(a_texts)} 项)...")
-    vectors_a = encode_texts(a_texts)
+    vectors_a = encode_texts(a_texts, model_name)
 
     if progress_callback:
         progress_callback(f"正在编码 B 表文本 ({len(b_texts)} 项)...")
-    vectors_b = encode_texts(b_texts)
+    vectors_b = encode_texts(b_texts, model_name)
 
     if progress_callback:
-        progress_callback("正在计算相似度矩阵...")
-    sim_matrix = compute_similarity_matrix(vectors_a, vectors_b)
+        progress_callback("正在计算相似度候选...")
+    floor = candidate_floor(threshold, floor)
+    rows, cols, scores, n_capped = score_candidates(
+        vectors_a, vectors_b, floor, top_k=top_k, progress_callback=progress_callback)
+    if n_capped:
+        logger.warning(f"{n_capped} 个 A 项的候选超过 top_k={top_k} 被截断，配对结果可能少于完整计算")
+        if progress_callback:
+            progress_callback(f"注意：{n_capped} 项的候选被截断（top_k={top_k}）")
 
     if progress_callback:
         progress_callback("正在执行贪心匹配...")
-    matches = greedy_match(sim_matrix, threshold, a_texts, b_texts)
-
+    accepted = greedy_assign(rows, cols, scores, len(a_texts), len(b_texts))
+    n = cut_at_threshold(accepted[2], threshold)
+    matches = [
+        (int(r), int(c), float(s))
+        for r, c, s in zip(accepted[0][:n], accepted[1][:n], accepted[2][:n])
+    ]
+
+    if return_details:
+        return matches, {
+            "vectors_a": vectors_a,
+            "vectors_b": vectors_b,
+            "accepted": accepted,
+            "floor": floor,
+            "capped": n_capped,
+        }
     return matches
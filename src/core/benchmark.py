@@ -0,0 +1,146 @@
+"""模型对比 - 在标注的文本对上比较各注册模型的速度和质量"""
+
+import time
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .model_manager import list_models, load_model
+from .ai_matcher import SCORE_CHUNK_SIZE, compute_similarity_matrix
+
+logger = logging.getLogger(__name__)
+
+
+def read_pairs(path):
+    """读取标注文件（Excel 或 CSV）的前三列，全部按文本读取
+
+    Returns:
+        DataFrame，列 a, b, label：a/b 已去除首尾空白，空白单元格为 NaN；
+        label 为原始文本，无第 3 列时为 NaN
+    """
+    if str(path).lower().endswith(".csv"):
+        df = pd.read_csv(path, header=0, dtype=str)
+    else:
+        df = pd.read_excel(path, header=0, dtype=str)
+    if df.shape[1] < 2:
+        raise ValueError(f"标注文件至少需要两列（A 文本, B 文本）: {path}")
+
+    def text(col):
+        s = col.str.strip()
+        return s.mask(s == "")
+
+    return pd.DataFrame({
+        "a": text(df.iloc[:, 0]),
+        "b": text(df.iloc[:, 1]),
+        "label": df.iloc[:, 2] if df.shape[1] >= 3 else None,
+    })
+
+
+def load_labeled_pairs(path):
+    """读取标注文本对（Excel 或 CSV）：第 1 列 A 文本，第 2 列 B 文本，可选第 3 列标签（1 = 匹配，0 = 不匹配）
+
+    Returns:
+        (a_texts, b_texts, labels)，labels 为 int8 数组；无标签列时全部视为匹配
+    """
+    df = read_pairs(path).dropna(subset=["a", "b"])
+    labels = pd.to_numeric(df["label"], errors="coerce").fillna(1).astype(int)
+    return df["a"].tolist(), df["b"].tolist(), labels.to_numpy(dtype=np.int8)
+
+
+def _auc(scores, labels):
+    """ROC AUC（Mann-Whitney 秩统计）；只有一类标签时返回 None"""
+    n_pos = int(labels.sum())
+    n_neg = len(labels) - n_pos
+    if n_pos == 0 or n_neg == 0:
+        return None
+    ranks = pd.Series(scores).rank().to_numpy()
+    return float((ranks[labels == 1].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg))
+
+
+def _best_f1(scores, labels):
+    """遍历所有分数作为阈值，返回 (最佳 F1, 对应阈值)；只有一类标签时返回 (None, None)"""
+    n_pos = int(labels.sum())
+    if n_pos == 0 or n_pos == len(labels):
+        return None, None
+    order = np.argsort(-scores)
+    tp = np.cumsum(labels[order] == 1)
+    predicted = np.arange(1, len(order) + 1)
+    f1 = 2 * tp / (predicted + n_pos)
+    best = int(np.argmax(f1))
+    return float(f1[best]), float(scores[order][best])
+
+
+def evaluate_model(name, a_texts, b_texts, labels):
+    """在一个模型上计算速度与质量指标"""
+    start = time.perf_counter()
+    model = load_model(name)
+    load_s = time.perf_counter() - start
+
+    unique_a = list(dict.fromkeys(a_texts))
+    unique_b = list(dict.fromkeys(b_texts))
+    start = time.perf_counter()
+    vectors_a = np.asarray(model.encode(unique_a, normalize_embeddings=True, show_progress_bar=False))
+    vectors_b = np.asarray(model.encode(unique_b, normalize_embeddings=True, show_progress_bar=False))
+    encode_s = time.perf_counter() - start
+
+    a_pos = {t: i for i, t in enumerate(unique_a)}
+    b_pos = {t: i for i, t in enumerate(unique_b)}
+    ai = np.array([a_pos[t] for t in a_texts])
+    bi = np.array([b_pos[t] for t in b_texts])
+    scores = np.einsum("ij,ij->i", vectors_a[ai], vectors_b[bi])
+
+    # Top-1 检索准确率：正例中 B 是否为该 A 在全部 B 文本中的最相似项
+    positive = labels == 1
+    top1 = None
+    if positive.any():
+        # 分块计算，避免生成完整的 正例数 × B 文本数 矩阵
+        pos_a = ai[positive]
+        pos_b = bi[positive]
+        hits = 0
+        for start in range(0, len(pos_a), SCORE_CHUNK_SIZE):
+            end = start + SCORE_CHUNK_SIZE
+            sim = compute_similarity_matrix(vectors_a[pos_a[start:end]], vectors_b)
+            hits += int(np.count_nonzero(np.argmax(sim, axis=1) == pos_b[start:end]))
+        top1 = hits / len(pos_a)
+
+    best_f1, best_threshold = _best_f1(scores, labels)
+    n_texts = len(unique_a) + len(unique_b)
+    return {
+        "model": name,
+        "dim": int(vectors_a.shape[1]),
+        "load_s": load_s,
+        "encode_s": encode_s,
+        "texts_per_s": n_texts / encode_s if encode_s > 0 else float("inf"),
+        "top1": top1,
+        "auc": _auc(scores, labels),
+        "best_f1": best_f1,
+        "best_threshold": best_threshold,
+        "mean_pos_score": float(scores[positive].mean()) if positive.any() else None,
+    }
+
+
+def benchmark_models(pairs_path, model_names=None, progress_callback=None):
+    """在标注文本对上比较多个注册模型
+
+    Args:
+        pairs_path: 标注文件，见 load_labeled_pairs
+        model_names: 模型注册名列表，None 表示本机可用的全部模型
+        progress_callback: 进度回调 fn(message)
+
+    Returns:
+        list of dict，每个模型一项，见 evaluate_model
+    """
+    a_texts, b_texts, labels = load_labeled_pairs(pairs_path)
+    names = model_names or list(list_models(available_only=True))
+
+    reports = []
+    for name in names:
+        if progress_callback:
+            progress_callback(f"正在评测模型 {name} ({len(a_texts)} 对)...")
+        try:
+            reports.append(evaluate_model(name, a_texts, b_texts, labels))
+        except Exception as e:
+            logger.warning(f"模型 {name} 评测失败: {e}")
+            reports.append({"model": name, "error": str(e)})
+    return reports
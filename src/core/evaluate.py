@@ -0,0 +1,194 @@
+"""评测 - 用标注的 A→B 正确配对评估匹配流程的准确率、耗时和内存"""
+
+import sys
+import time
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .matcher import run_match
+from .match_result import STATUS_LABELS, STATUS_EXACT, STATUS_FUZZY, STATUS_UNMATCHED
+from .ai_matcher import cut_at_threshold
+from .benchmark import read_pairs
+
+logger = logging.getLogger(__name__)
+
+
+def _key(text):
+    """与精确匹配相同的归一化：strip + 小写"""
+    return str(text).strip().lower()
+
+
+def load_gold(path):
+    """读取标注文件（Excel 或 CSV）：第 1 列 A 文本，第 2 列正确的 B 文本
+
+    同一 A 可出现多行（多个可接受的 B）；B 为空表示该 A 不应匹配任何 B。
+
+    Returns:
+        dict: 归一化 A 文本 -> 可接受的归一化 B 文本集合（空集合表示应为未匹配）
+    """
+    df = read_pairs(path).dropna(subset=["a"])
+    gold = {}
+    for a_text, b_text in zip(df["a"], df["b"]):
+        accepted = gold.setdefault(_key(a_text), set())
+        if pd.notna(b_text):
+            accepted.add(_key(b_text))
+    return gold
+
+
+def _peak_rss_mb():
+    """进程峰值常驻内存（MB），无法获取时返回 None"""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 单位为字节，Linux 为 KB
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+
+def _prf(tp, fp, n_pos):
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / n_pos if n_pos else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
+
+
+def score_result(result, gold, thresholds=None):
+    """按标注评估匹配结果
+
+    只统计出现在标注中的 A 项。精确匹配与 AI 配对分别判定是否正确，
+    各阈值下的指标由保留的 AI 配对前缀累加得到，不重新匹配。
+
+    Returns:
+        dict with keys:
+            labeled: 参与评测的 A 项数
+            positives: 标注中有正确 B 的 A 项数
+            negatives: 标注为不应匹配的 A 项数
+            by_status: {状态: {count, correct, precision, recall, f1}}（当前阈值）；
+                精确/模糊匹配的召回率 = 该状态正确数 / 应有匹配数，
+                未匹配的召回率 = 正确的未匹配数 / 不应匹配数
+            overall: {precision, recall, f1}（当前阈值）
+            by_threshold: list of {threshold, fuzzy, precision, recall, f1}
+    """
+    # 去重后的字符串只归一化一次
+    a_keys = [_key(t) for t in result.a_items.values]
+    a_keys = [a_keys[c] for c in result.a_items.codes.tolist()]
+    b_keys = [_key(t) for t in result.b_items.values]
+    b_keys = [b_keys[c] for c in result.b_items.codes.tolist()]
+
+    labeled = np.array([k in gold for k in a_keys], dtype=bool)
+    positive = np.array([bool(gold.get(k)) for k in a_keys], dtype=bool)
+    n_pos = int(positive.sum())
+    n_neg = int(labeled.sum()) - n_pos
+
+    def correct(a_idx, b_idx):
+        return b_keys[b_idx] in gold.get(a_keys[a_idx], ())
+
+    # 当前阈值下按状态统计
+    by_status = {}
+    for code in (STATUS_EXACT, STATUS_FUZZY, STATUS_UNMATCHED):
+        by_status[STATUS_LABELS[code]] = {"count": 0, "correct": 0}
+    for a_idx in np.flatnonzero(labeled).tolist():
+        b_idx = int(result.b_idx[a_idx])
+        stats = by_status[STATUS_LABELS[result.status[a_idx]]]
+        stats["count"] += 1
+        if b_idx >= 0:
+            stats["correct"] += correct(a_idx, b_idx)
+        else:
+            stats["correct"] += not positive[a_idx]
+    for status, stats in by_status.items():
+        relevant = n_neg if status == STATUS_LABELS[STATUS_UNMATCHED] else n_pos
+        stats["precision"], stats["recall"], stats["f1"] = _prf(
+            stats["correct"], stats["count"] - stats["correct"], relevant)
+
+    tp = by_status["精确匹配"]["correct"] + by_status["模糊匹配"]["correct"]
+    n_pred = by_status["精确匹配"]["count"] + by_status["模糊匹配"]["count"]
+    precision, recall, f1 = _prf(tp, n_pred - tp, n_pos)
+
+    by_threshold = []
+    scoring = result.get("scoring")
+    if scoring is not None:
+        exact_labeled = [(a, b) for a, b in zip(scoring["exact_a"].tolist(), scoring["exact_b"].tolist())
+                         if labeled[a]]
+        exact_tp = sum(correct(a, b) for a, b in exact_labeled)
+        exact_fp = len(exact_labeled) - exact_tp
+
+        # AI 配对已按相似度降序排列：累加即得各阈值下的 TP / FP
+        fuzzy_a = scoring["fuzzy_a"].tolist()
+        fuzzy_b = scoring["fuzzy_b"].tolist()
+        is_labeled = np.array([labeled[a] for a in fuzzy_a], dtype=bool)
+        is_correct = np.array([correct(a, b) for a, b in zip(fuzzy_a, fuzzy_b)], dtype=bool)
+        cum_tp = np.concatenate([[0], np.cumsum(is_correct & is_labeled)])
+        cum_fp = np.concatenate([[0], np.cumsum(~is_correct & is_labeled)])
+
+        if thresholds is None:
+            thresholds = np.round(np.arange(np.ceil(scoring["floor"] * 20) / 20, 1.0001, 0.05), 2)
+        for t in thresholds:
+            if t < scoring["floor"] - 1e-9:
+                continue
+            n = cut_at_threshold(scoring["fuzzy_sim"], t)
+            t_tp = exact_tp + int(cum_tp[n])
+            t_fp = exact_fp + int(cum_fp[n])
+            p, r, f = _prf(t_tp, t_fp, n_pos)
+            by_threshold.append({
+                "threshold": float(t), "fuzzy": n, "precision": p, "recall": r, "f1": f,
+            })
+
+    return {
+        "labeled": int(labeled.sum()),
+        "positives": n_pos,
+        "negatives": n_neg,
+        "by_status": by_status,
+        "overall": {"precision": precision, "recall": recall, "f1": f1},
+        "by_threshold": by_threshold,
+    }
+
+
+def evaluate(file_a, file_b, gold_path, threshold=0.85, progress_callback=None,
+             thresholds=None, **match_kwargs):
+    """运行完整匹配流程并按标注评测
+
+    Args:
+        file_a / file_b / threshold / match_kwargs: 传给 run_match
+        gold_path: 标注文件，见 load_gold
+        thresholds: 需要评测的阈值列表，默认从候选下限到 1.0，步长 0.05
+
+    Returns:
+        dict：score_result 的结果，另含
+            time_s: 匹配总耗时
+            stages: list of (message, seconds)，各进度阶段耗时
+            peak_rss_mb: 进程峰值内存（MB）
+            result: 匹配结果
+    """
+    gold = load_gold(gold_path)
+
+    stages = []
+    last = [time.perf_counter(), None]
+
+    def track(message):
+        now = time.perf_counter()
+        if last[1] is not None:
+            stages.append((last[1], now - last[0]))
+        last[0], last[1] = now, message
+        if progress_callback and message is not None:
+            progress_callback(message)
+
+    start = time.perf_counter()
+    result = run_match(file_a, file_b, threshold=threshold, progress_callback=track, **match_kwargs)
+    elapsed = time.perf_counter() - start
+    track(None)
+
+    report = score_result(result, gold, thresholds)
+    report["time_s"] = elapsed
+    report["stages"] = stages
+    report["peak_rss_mb"] = _peak_rss_mb()
+    report["result"] = result
+    return report
@@ -0,0 +1,178 @@
+"""紧凑匹配结果 - 下标数组 + float32 相似度 + uint8 状态码，字符串去重存储
+
+旧版结果是 dict，matches 为 (a_text, b_text, similarity, status) 元组列表。
+MatchResult 保留 result["key"] 形式的访问，matches / pairs / unmatched_b 等
+以惰性视图提供，按需生成元组，不再为每行保存 Python 对象。
+"""
+
+from collections.abc import Sequence
+
+import numpy as np
+import pandas as pd
+
+# 匹配状态编码（下标即编码）
+STATUS_EXACT = 0
+STATUS_FUZZY = 1
+STATUS_UNMATCHED = 2
+STATUS_B_UNUSED = 3
+STATUS_PENDING = 4
+STATUS_LABELS = ("精确匹配", "模糊匹配", "未匹配", "B表未使用", "匹配中")
+
+
+class ItemArray(Sequence):
+    """去重存储的字符串数组：唯一字符串（object 数组）+ int32 编码"""
+
+    __slots__ = ("values", "codes")
+
+    def __init__(self, values, codes):
+        self.values = np.asarray(values, dtype=object)
+        self.codes = np.asarray(codes, dtype=np.int32)
+
+    @classmethod
+    def from_list(cls, items):
+        if isinstance(items, ItemArray):
+            return items
+        codes, uniques = pd.factorize(pd.Series(list(items), dtype=object), sort=False)
+        return cls(uniques, codes)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return ItemArray(self.values, self.codes[idx])
+        return self.values[self.codes[idx]]
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def take(self, indices):
+        """按下标取出 object 数组，下标 -1 取空字符串"""
+        indices = np.asarray(indices, dtype=np.int64)
+        lookup = np.append(self.values, "")
+        codes = np.append(self.codes, len(self.values))
+        return lookup[codes[indices]]
+
+    def tolist(self):
+        return self.values[self.codes].tolist()
+
+
+class _RowView(Sequence):
+    """按行惰性生成元素的只读视图"""
+
+    __slots__ = ("_length", "_getter")
+
+    def __init__(self, length, getter):
+        self._length = length
+        self._getter = getter
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self._getter(i) for i in range(*idx.indices(self._length))]
+        if idx < 0:
+            idx += self._length
+        if not 0 <= idx < self._length:
+            raise IndexError(idx)
+        return self._getter(idx)
+
+
+class MatchResult:
+    """紧凑匹配结果，A 表每行一项（行号即 A 表下标）
+
+    Attributes:
+        a_items / b_items: ItemArray
+        b_idx: int32，每个 A 项匹配到的 B 下标，未匹配为 -1
+        sim: float32 相似度
+        status: uint8 状态码（STATUS_*）
+        unmatched_b_idx: int32，B 表未使用项下标
+        其余字段（a_provenance, b_provenance, embeddings, scoring, threshold,
+        model, edits）含义同 run_match 的说明
+    """
+
+    # 可通过 result["key"] 访问的字段
+    _FIELDS = (
+        "a_items", "b_items", "a_provenance", "b_provenance", "embeddings",
+        "scoring", "threshold", "model", "edits",
+        "matches", "pairs", "unmatched_b", "unmatched_b_indices", "n_fuzzy",
+    )
+
+    def __init__(self, a_items, b_items, b_idx, sim, status, unmatched_b_idx,
+                 a_provenance=None, b_provenance=None, embeddings=None,
+                 scoring=None, threshold=None, model=None, edits=None):
+        self.a_items = ItemArray.from_list(a_items)
+        self.b_items = ItemArray.from_list(b_items)
+        self.b_idx = np.asarray(b_idx, dtype=np.int32)
+        self.sim = np.asarray(sim, dtype=np.float32)
+        self.status = np.asarray(status, dtype=np.uint8)
+        self.unmatched_b_idx = np.asarray(unmatched_b_idx, dtype=np.int32)
+        self.a_provenance = a_provenance
+        self.b_provenance = b_provenance
+        self.embeddings = embeddings
+        self.scoring = scoring
+        self.threshold = threshold
+        self.model = model
+        self.edits = {} if edits is None else edits
+
+    # --- 兼容旧版 dict 结果的视图 ---
+
+    def _row(self, i):
+        b = self.b_idx[i]
+        return (
+            self.a_items[i],
+            self.b_items[b] if b >= 0 else "",
+            float(self.sim[i]),
+            STATUS_LABELS[self.status[i]],
+        )
+
+    @property
+    def matches(self):
+        """(a_text, b_text, similarity, status) 的惰性视图"""
+        return _RowView(len(self.b_idx), self._row)
+
+    @property
+    def pairs(self):
+        """(a_idx, b_idx) 的惰性视图"""
+        return _RowView(len(self.b_idx), lambda i: (i, int(self.b_idx[i])))
+
+    @property
+    def unmatched_b(self):
+        return _RowView(len(self.unmatched_b_idx), lambda i: self.b_items[self.unmatched_b_idx[i]])
+
+    @property
+    def unmatched_b_indices(self):
+        return self.unmatched_b_idx
+
+    @property
+    def n_fuzzy(self):
+        return int(np.count_nonzero(self.status == STATUS_FUZZY))
+
+    def counts(self):
+        """A 表各状态的行数"""
+        return np.bincount(self.status, minlength=len(STATUS_LABELS))
+
+    def __getitem__(self, key):
+        if key not in self._FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self._FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self._FIELDS
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in self._FIELDS else None
+        return default if value is None else value
+
+    def setdefault(self, key, default=None):
+        value = self.get(key)
+        if value is None:
+            self[key] = default
+            value = default
+        return value
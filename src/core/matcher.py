@@ -1,18 +1,174 @@
 """匹配引擎 - 编排精确匹配 + AI 语义匹配"""
 
+import os
+import glob
 import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
 
-from .ai_matcher import ai_match
+from .ai_matcher import ai_match, cut_at_threshold
+from .model_manager import DEFAULT_MODEL
+from .session import spill_embeddings
+from .match_result import (
+    MatchResult, ItemArray, STATUS_EXACT, STATUS_FUZZY, STATUS_UNMATCHED, STATUS_B_UNUSED,
+    STATUS_LABELS,
+)
 
 logger = logging.getLogger(__name__)
 
+# 并行读取文件/工作表的最大线程数
+MAX_LOAD_WORKERS = 8
+
+# 增量发布结果时每批的行数
+ROW_BATCH_SIZE = 20000
+
+
+def resolve_files(spec):
+    """展开文件规格：单个路径、以 ; 分隔的多个路径、通配符，或路径列表
+
+    Returns:
+        去重后的文件路径列表（保持输入顺序，通配符结果按文件名排序）
+    """
+    if isinstance(spec, str):
+        parts = spec.split(";")
+    else:
+        parts = list(spec)
+
+    files = []
+    for part in parts:
+        part = str(part).strip()
+        if not part:
+            continue
+        # 已存在的文件按字面路径使用（文件名可能含 [ ] 等通配字符）
+        if not os.path.isfile(part) and any(ch in part for ch in "*?["):
+            files.extend(sorted(glob.glob(part)))
+        else:
+            files.append(part)
+    return list(dict.fromkeys(files))
+
+
+def _parse_sheet_spec(sheets):
+    """解析工作表选择：None/空 = 第一个工作表，"*" = 全部，"a,b" 或列表 = 指定名称"""
+    if sheets is None:
+        return None
+    if isinstance(sheets, str):
+        sheets = sheets.strip()
+        if not sheets:
+            return None
+        if sheets == "*":
+            return "*"
+        return [s.strip() for s in sheets.split(",") if s.strip()]
+    return list(sheets)
+
+
+def _select_sheets(path, names, sheet_spec):
+    """从文件的工作表名称列表中返回选中的工作表"""
+    if sheet_spec is None:
+        return names[:1]
+    if sheet_spec == "*":
+        return names
 
-def load_first_column(filepath):
-    """读取 Excel 文件第一列，返回字符串列表"""
-    df = pd.read_excel(filepath, header=0)
-    col = df.iloc[:, 0].dropna().astype(str).str.strip().tolist()
-    return col
+    selected = []
+    for sheet in sheet_spec:
+        if isinstance(sheet, int):
+            if not (0 <= sheet < len(names)):
+                raise ValueError(f"文件 {path} 中不存在第 {sheet + 1} 个工作表")
+            selected.append(names[sheet])
+        elif sheet in names:
+            selected.append(sheet)
+        else:
+            raise ValueError(f"文件 {path} 中不存在工作表: {sheet}")
+    return selected
+
+
+def _first_column(df):
+    """取工作表第一列，返回 (文本列表, Excel 行号数组)"""
+    if df.shape[1] == 0:
+        return [], np.empty(0, dtype=np.int32)
+    col = df.iloc[:, 0].dropna()
+    texts = col.astype(str).str.strip().tolist()
+    # 表头占第 1 行，数据从第 2 行开始
+    rows = (col.index.to_numpy() + 2).astype(np.int32)
+    return texts, rows
+
+
+def _read_file_sheets(path, sheet_spec):
+    """打开一次工作簿，读取所有选中工作表的第一列
+
+    Returns:
+        list of (sheet, texts, rows)，按工作表顺序
+    """
+    with pd.ExcelFile(path) as xf:
+        names = _select_sheets(path, list(xf.sheet_names), sheet_spec)
+        frames = pd.read_excel(xf, sheet_name=names, header=0) if names else {}
+    return [(sheet, *_first_column(frames[sheet])) for sheet in names]
+
+
+def load_sources(spec, sheets=None, max_workers=None):
+    """读取多个文件/工作表的第一列并按顺序拼接（线程池并行读取）
+
+    每个工作簿只打开一次，一次读出其中所有选中的工作表；多个工作簿并行读取。
+
+    Args:
+        spec: 文件规格，见 resolve_files
+        sheets: 工作表选择，见 _parse_sheet_spec
+        max_workers: 最大线程数
+
+    Returns:
+        (items, provenance)
+            items: 拼接后的字符串列表
+            provenance: dict with keys:
+                sources: list of (file, sheet)，每个来源一项
+                source: int32 数组，每个 item 所属来源的下标
+                row: int32 数组，每个 item 在原工作表中的 Excel 行号
+    """
+    files = resolve_files(spec)
+    if not files:
+        raise ValueError(f"没有找到匹配的文件: {spec}")
+    for path in files:
+        if not os.path.isfile(path):
+            raise ValueError(f"文件不存在: {path}")
+
+    sheet_spec = _parse_sheet_spec(sheets)
+    # 读取任务按工作簿划分，线程数不超过任务数
+    workers = max_workers or min(MAX_LOAD_WORKERS, len(files))
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            per_file = list(pool.map(lambda p: _read_file_sheets(p, sheet_spec), files))
+    else:
+        per_file = [_read_file_sheets(p, sheet_spec) for p in files]
+
+    sources = []
+    items = []
+    source_idx = []
+    rows = []
+    for path, sheets_read in zip(files, per_file):
+        for sheet, texts, row_numbers in sheets_read:
+            source_idx.append(np.full(len(texts), len(sources), dtype=np.int32))
+            sources.append((path, sheet))
+            items.extend(texts)
+            rows.append(row_numbers)
+
+    provenance = {
+        "sources": sources,
+        "source": np.concatenate(source_idx) if source_idx else np.empty(0, dtype=np.int32),
+        "row": np.concatenate(rows) if rows else np.empty(0, dtype=np.int32),
+    }
+    return items, provenance
+
+
+def is_multi_source(provenance):
+    """是否来自多个文件/工作表"""
+    return provenance is not None and len(provenance["sources"]) > 1
+
+
+def format_source(provenance, idx):
+    """格式化第 idx 项的来源：文件名[工作表]:行号"""
+    path, sheet = provenance["sources"][provenance["source"][idx]]
+    return f"{os.path.basename(path)}[{sheet}]:{provenance['row'][idx]}"
 
 
 def exact_match(a_items, b_items):
@@ -51,29 +207,65 @@ def exact_match(a_items, b_items):
     return matches, unmatched_a, unmatched_b
 
 
-def run_match(file_a, file_b, threshold=0.85, progress_callback=None):
+def _publish_rows(partial_callback, a_idx, b_idx, sim, status):
+    """把一组 A 表行的结果按 ROW_BATCH_SIZE 分批发布"""
+    for start in range(0, len(a_idx), ROW_BATCH_SIZE):
+        end = start + ROW_BATCH_SIZE
+        partial_callback({
+            "type": "rows",
+            "a_idx": a_idx[start:end],
+            "b_idx": b_idx[start:end],
+            "sim": sim[start:end],
+            "status": status[start:end],
+        })
+
+
+def run_match(file_a, file_b, threshold=0.85, progress_callback=None,
+              sheets_a=None, sheets_b=None, model_name=None, partial_callback=None,
+              candidate_top_k=None, candidate_floor=None):
     """执行完整匹配流程
 
     Args:
-        file_a: Excel A 文件路径
-        file_b: Excel B 文件路径
+        file_a: Excel A 文件规格（路径、; 分隔的多个路径、通配符或列表）
+        file_b: Excel B 文件规格
         threshold: AI 匹配相似度阈值
         progress_callback: 进度回调 fn(message)
+        sheets_a: A 表工作表选择（None = 第一个，"*" = 全部，或名称列表）
+        sheets_b: B 表工作表选择
+        model_name: 模型注册名（见 model_manager.list_models），None 表示默认模型
+        partial_callback: 增量结果回调 fn(event)，事件依次为
+            {"type": "begin", a_items, b_items, a_provenance, b_provenance}：读取完成
+            {"type": "rows", a_idx, b_idx, sim, status}：一批 A 表行的最终结果
+                （精确匹配先发布；AI 配对需全局贪心，全部候选计算完成后再分批发布）
+        candidate_top_k: 可选，每个 A 项最多保留的 AI 候选数（限制内存，可能少配对），
+            默认保留下限以上的全部候选
+        candidate_floor: AI 候选保留下限（之后可把阈值调低到此值而不重新匹配），
+            默认 threshold - 0.1
 
     Returns:
-        dict with keys:
-            matches: list of (a_text, b_text, similarity, status)
-            a_items: 完整 A 表项目列表
-            b_items: 完整 B 表项目列表
-            unmatched_b: B 表未使用项的索引列表
+        MatchResult（兼容旧版 dict 的 result["key"] 访问）:
+            matches: (a_text, b_text, similarity, status) 的惰性视图，按 A 表顺序
+            a_items / b_items: 完整 A / B 表项目（ItemArray）
+            b_idx / sim / status: A 表每行的 B 下标（-1 为未匹配）、相似度、状态码
+            unmatched_b / unmatched_b_indices: B 表未使用项及其下标
+            pairs: (a_idx, b_idx) 的惰性视图，未匹配时 b_idx 为 -1
+            a_provenance / b_provenance: 来源信息，见 load_sources
+            model: 所用模型注册名（向量与相似度候选均与该模型对应）
+            embeddings: AI 匹配所用向量 {a_indices, a, b_indices, b}（临时 npy 的内存映射），
+                无 AI 匹配时为 None
+            threshold: 本次使用的阈值
+            scoring: 保留的配对信息，用于 rethreshold / threshold_sweep
+            n_fuzzy: 模糊匹配数
+            edits: 用户编辑 {(result_row, col): value}，result_row 为
+                   matches 与 unmatched_b 依次拼接后的行号
     """
     if progress_callback:
         progress_callback("正在读取 Excel A ...")
-    a_items = load_first_column(file_a)
+    a_items, a_provenance = load_sources(file_a, sheets_a)
 
     if progress_callback:
         progress_callback("正在读取 Excel B ...")
-    b_items = load_first_column(file_b)
+    b_items, b_provenance = load_sources(file_b, sheets_b)
 
     if progress_callback:
         progress_callback(f"A 表 {len(a_items)} 项, B 表 {len(b_items)} 项")
@@ -86,59 +278,252 @@ def run_match(file_a, file_b, threshold=0.85, progress_callback=None):
     if progress_callback:
         progress_callback(f"精确匹配: {len(exact_matches)} 对")
 
+    exact = np.asarray(exact_matches, dtype=np.int32).reshape(-1, 3)[:, :2]
+    # 增量结果与最终结果共用同一组 ItemArray，结果页可复用已建立的文本索引
+    a_array = ItemArray.from_list(a_items)
+    b_array = ItemArray.from_list(b_items)
+    if partial_callback:
+        partial_callback({
+            "type": "begin",
+            "a_items": a_array,
+            "b_items": b_array,
+            "a_provenance": a_provenance,
+            "b_provenance": b_provenance,
+        })
+        _publish_rows(
+            partial_callback, exact[:, 0], exact[:, 1],
+            np.ones(len(exact), dtype=np.float32),
+            np.full(len(exact), STATUS_EXACT, dtype=np.uint8),
+        )
+
     # Step 2: AI 模糊匹配（仅未匹配项）
-    ai_matches_raw = []
+    embeddings = None
+    fuzzy = (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32))
+    floor = 0.0
+    capped = 0
     if unmatched_a_indices and unmatched_b_indices:
         unmatched_a_texts = [a_items[i] for i in unmatched_a_indices]
         unmatched_b_texts = [b_items[i] for i in unmatched_b_indices]
 
-        ai_matches_raw = ai_match(
+        _, details = ai_match(
             unmatched_a_texts,
             unmatched_b_texts,
             threshold=threshold,
-            progress_callback=progress_callback
+            progress_callback=progress_callback,
+            return_details=True,
+            model_name=model_name,
+            top_k=candidate_top_k,
+            floor=candidate_floor,
         )
 
-    # 将 AI 匹配的局部索引映射回全局索引
-    ai_matched_a = set()
-    ai_matched_b = set()
-    ai_matches = []
-    for local_a, local_b, sim in ai_matches_raw:
-        global_a = unmatched_a_indices[local_a]
-        global_b = unmatched_b_indices[local_b]
-        ai_matches.append((global_a, global_b, sim))
-        ai_matched_a.add(global_a)
-        ai_matched_b.add(global_b)
+        # 将 AI 匹配的局部索引映射回全局索引
+        ua = np.asarray(unmatched_a_indices, dtype=np.int32)
+        ub = np.asarray(unmatched_b_indices, dtype=np.int32)
+        rows, cols, scores = details["accepted"]
+        fuzzy = (ua[rows], ub[cols], scores)
+        floor = details["floor"]
+        capped = details["capped"]
+        # 向量只在保存会话时使用：转存为临时 npy 并以内存映射持有
+        embeddings = spill_embeddings({
+            "a_indices": ua,
+            "a": np.asarray(details["vectors_a"], dtype=np.float32),
+            "b_indices": ub,
+            "b": np.asarray(details["vectors_b"], dtype=np.float32),
+        })
+        del details
 
-    if progress_callback:
-        progress_callback(f"AI 匹配: {len(ai_matches)} 对")
-
-    # 构建按 A 表原始顺序排列的结果
-    # 先建索引映射
-    a_match_info = {}
-    for a_idx, b_idx, sim in exact_matches:
-        a_match_info[a_idx] = (b_items[b_idx], sim, "精确匹配")
-    for a_idx, b_idx, sim in ai_matches:
-        a_match_info[a_idx] = (b_items[b_idx], sim, "模糊匹配")
-
-    results = []
-    for a_idx in range(len(a_items)):
-        if a_idx in a_match_info:
-            b_text, sim, status = a_match_info[a_idx]
-            results.append((a_items[a_idx], b_text, sim, status))
-        elif a_idx in set(unmatched_a_indices) - ai_matched_a:
-            results.append((a_items[a_idx], "", 0.0, "未匹配"))
+    scoring = {
+        "exact_a": exact[:, 0].copy(),
+        "exact_b": exact[:, 1].copy(),
+        "fuzzy_a": fuzzy[0],
+        "fuzzy_b": fuzzy[1],
+        "fuzzy_sim": fuzzy[2],
+        "floor": floor,
+        "capped": capped,
+    }
 
-    # B 表未使用项
-    still_unmatched_b = [i for i in unmatched_b_indices if i not in ai_matched_b]
-    unmatched_b_items = [b_items[i] for i in still_unmatched_b]
+    result = build_result(a_array, b_array, scoring, threshold)
+    result["a_provenance"] = a_provenance
+    result["b_provenance"] = b_provenance
+    result["embeddings"] = embeddings
+    result["model"] = model_name or DEFAULT_MODEL
+
+    if partial_callback:
+        # 其余 A 表行（模糊匹配 / 未匹配）
+        rest = np.flatnonzero(result.status != STATUS_EXACT).astype(np.int32)
+        _publish_rows(
+            partial_callback, rest,
+            result.b_idx[rest], result.sim[rest], result.status[rest],
+        )
 
     if progress_callback:
+        progress_callback(f"AI 匹配: {result['n_fuzzy']} 对")
         progress_callback("匹配完成！")
 
+    return result
+
+
+def build_result(a_items, b_items, scoring, threshold):
+    """根据精确匹配和保留的 AI 贪心配对，在给定阈值下组装结果（不涉及编码）
+
+    Args:
+        scoring: dict with keys:
+            exact_a / exact_b: 精确匹配的全局下标
+            fuzzy_a / fuzzy_b / fuzzy_sim: 不设阈值的 AI 贪心配对，按相似度降序
+            floor: 保留候选的相似度下限
+            capped: 候选被 top_k 截断的 A 项数（0 表示配对与完整计算一致）
+        threshold: AI 匹配相似度阈值，不能低于 floor
+    """
+    if threshold < scoring["floor"] - 1e-9:
+        raise ValueError(
+            f"阈值 {threshold} 低于已保留候选的下限 {scoring['floor']:.2f}，请重新匹配"
+        )
+
+    n_fuzzy = cut_at_threshold(scoring["fuzzy_sim"], threshold)
+    n_a = len(a_items)
+
+    # 按 A 表原始顺序排列：每行的 B 下标、相似度、状态码
+    b_idx = np.full(n_a, -1, dtype=np.int32)
+    sim = np.zeros(n_a, dtype=np.float32)
+    status = np.full(n_a, STATUS_UNMATCHED, dtype=np.uint8)
+
+    b_idx[scoring["exact_a"]] = scoring["exact_b"]
+    sim[scoring["exact_a"]] = 1.0
+    status[scoring["exact_a"]] = STATUS_EXACT
+
+    fuzzy_a = scoring["fuzzy_a"][:n_fuzzy]
+    b_idx[fuzzy_a] = scoring["fuzzy_b"][:n_fuzzy]
+    sim[fuzzy_a] = scoring["fuzzy_sim"][:n_fuzzy]
+    status[fuzzy_a] = STATUS_FUZZY
+
+    # B 表未使用项
+    used_b = np.zeros(len(b_items), dtype=bool)
+    used_b[b_idx[b_idx >= 0]] = True
+    unmatched_b_idx = np.flatnonzero(~used_b).astype(np.int32)
+
+    return MatchResult(
+        a_items, b_items, b_idx, sim, status, unmatched_b_idx,
+        scoring=scoring, threshold=threshold,
+    )
+
+
+def rethreshold(result, threshold):
+    """在新阈值下重新配对（只重做分配步骤，不重新编码）
+
+    A 表行的编辑会保留（行号即 A 表下标），B 表未使用项的编辑因行号变化而丢弃。
+    """
+    scoring = result.get("scoring")
+    if scoring is None:
+        raise ValueError("该结果没有保留相似度候选，请重新匹配")
+
+    new_result = build_result(result["a_items"], result["b_items"], scoring, threshold)
+    for key in ("a_provenance", "b_provenance", "embeddings", "model"):
+        new_result[key] = result.get(key)
+
+    n_a = len(result["a_items"])
+    new_result["edits"] = {
+        key: value for key, value in result.get("edits", {}).items() if key[0] < n_a
+    }
+    return new_result
+
+
+def threshold_sweep(result, thresholds=None):
+    """一次遍历保留的贪心配对，统计各阈值下的匹配数
+
+    Args:
+        thresholds: 阈值列表，默认从候选下限到 1.0，步长 0.01
+
+    Returns:
+        dict with keys:
+            thresholds: 阈值数组
+            fuzzy: 各阈值下的模糊匹配数
+            unmatched: 各阈值下 A 表未匹配数
+            hist_edges / hist_counts: 配对相似度直方图（步长 0.05）
+    """
+    scoring = result.get("scoring")
+    if scoring is None:
+        raise ValueError("该结果没有保留相似度候选，请重新匹配")
+
+    floor = scoring["floor"]
+    if thresholds is None:
+        thresholds = np.round(np.arange(np.floor(floor * 100) / 100, 1.0001, 0.01), 2)
+    thresholds = np.asarray(thresholds, dtype=np.float32)
+
+    # 贪心配对已按降序排列：阈值 t 下的匹配数即 score >= t 的个数
+    ascending = scoring["fuzzy_sim"][::-1]
+    fuzzy = len(ascending) - np.searchsorted(ascending, thresholds, side="left")
+    n_unmatched_base = len(result["a_items"]) - len(scoring["exact_a"])
+
+    edges = np.round(np.arange(np.floor(floor * 20) / 20, 1.0001, 0.05), 2)
+    if len(edges) < 2:
+        edges = np.array([floor, 1.0])
+    hist_counts, hist_edges = np.histogram(scoring["fuzzy_sim"], bins=edges)
+
     return {
-        "matches": results,
-        "a_items": a_items,
-        "b_items": b_items,
-        "unmatched_b": unmatched_b_items,
+        "thresholds": thresholds,
+        "fuzzy": fuzzy,
+        "unmatched": n_unmatched_base - fuzzy,
+        "hist_edges": hist_edges,
+        "hist_counts": hist_counts,
     }
+
+
+RESULT_HEADERS = ["A表项目", "B表匹配项", "相似度", "匹配状态"]
+SOURCE_HEADERS = ["A来源", "B来源"]
+
+
+def result_table(result, apply_edits=True):
+    """把匹配结果展开为表格行（A 表结果在前，B 表未使用项在后，不含分隔行）
+
+    Returns:
+        (headers, rows, statuses)
+            rows: list of list，行号即 result_row
+            statuses: 每行的匹配状态
+    """
+    a_prov = result.get("a_provenance")
+    b_prov = result.get("b_provenance")
+    show_source = is_multi_source(a_prov) or is_multi_source(b_prov)
+
+    headers = list(RESULT_HEADERS)
+    if show_source:
+        headers += SOURCE_HEADERS
+
+    # 按列组装：A 表行在前，B 表未使用项在后
+    n_a = len(result.b_idx)
+    n_b = len(result.unmatched_b_idx)
+    b_rows = np.concatenate([result.b_idx, result.unmatched_b_idx])
+    sim_col = [f"{s:.3f}" if s > 0 else "" for s in result.sim.tolist()] + [""] * n_b
+    status_codes = np.concatenate([result.status, np.full(n_b, STATUS_B_UNUSED, dtype=np.uint8)])
+    statuses = np.asarray(STATUS_LABELS, dtype=object)[status_codes].tolist()
+    columns = [
+        result.a_items.tolist() + [""] * n_b,
+        result.b_items.take(b_rows).tolist(),
+        sim_col,
+        statuses,
+    ]
+    if show_source:
+        columns.append([format_source(a_prov, i) for i in range(n_a)] + [""] * n_b)
+        columns.append([format_source(b_prov, b) if b >= 0 else "" for b in b_rows.tolist()])
+    rows = [list(row) for row in zip(*columns)]
+
+    if apply_edits:
+        for (row_idx, col), value in result.get("edits", {}).items():
+            if row_idx < len(rows) and col < len(headers):
+                rows[row_idx][col] = value
+
+    return headers, rows, statuses
+
+
+def separator_row(width):
+    """A 表结果与 B 表未使用项之间的分隔行"""
+    return ["━" * 10, "━" * 10] + [""] * (width - 2)
+
+
+def export_result(result, path):
+    """导出结果（含用户编辑）为 Excel 文件"""
+    headers, rows, statuses = result_table(result)
+    n_a = len(result.b_idx)
+    if n_a < len(rows):
+        rows = rows[:n_a] + [separator_row(len(headers))] + rows[n_a:]
+    df = pd.DataFrame(rows, columns=headers)
+    df.to_excel(path, index=False, engine="openpyxl")
@@ -1,7 +1,8 @@
-"""模型缓存管理 - 管理 BAAI/bge-base-zh-v1.5 模型的下载和缓存"""
+"""模型缓存管理 - 模型注册表 + 模型的下载和缓存（默认 BAAI/bge-base-zh-v1.5）"""
 
 import os
 import sys
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,8 +10,17 @@ logger = logging.getLogger(__name__)
 MODEL_NAME = "BAAI/bge-base-zh-v1.5"
 APP_NAME = "VLookupPro"
 
+# 内置模型：注册名 -> HuggingFace 模型名（经内置/缓存目录查找；只有默认模型可在线下载，
+# 其余内置模型须随 EXE 打包或已在本机缓存，否则不出现在可选列表中）
+BUILTIN_MODELS = {
+    "bge-base-zh": MODEL_NAME,
+    "bge-small-zh": "BAAI/bge-small-zh-v1.5",
+}
+DEFAULT_MODEL = "bge-base-zh"
+REGISTRY_FILE = "registry.json"
 
-def _get_bundled_model_path():
+
+def _get_bundled_model_path(model_name=MODEL_NAME):
     """检查是否有打包在 EXE 内的模型"""
     # PyInstaller 打包后 sys._MEIPASS 指向临时解压目录
     if hasattr(sys, '_MEIPASS'):
@@ -18,7 +28,7 @@ def _get_bundled_model_path():
     else:
         base = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-    model_dir_name = MODEL_NAME.replace("/", "_")
+    model_dir_name = model_name.replace("/", "_")
     bundled_path = os.path.join(base, "models", model_dir_name)
     if os.path.exists(bundled_path) and os.path.isfile(os.path.join(bundled_path, "config.json")):
         logger.info(f"找到内置模型: {bundled_path}")
@@ -26,18 +36,32 @@ def _get_bundled_model_path():
     return None
 
 
-def get_cache_dir():
-    """获取模型缓存目录，检查多个可能的缓存位置"""
+def _get_app_cache_dir():
+    """应用专属模型缓存目录"""
+    if sys.platform == "darwin":
+        return os.path.join(os.path.expanduser("~"), "Library", "Caches", APP_NAME, "models")
+    elif sys.platform == "win32":
+        return os.path.join(os.environ.get("LOCALAPPDATA", os.path.expanduser("~")), APP_NAME, "models")
+    return os.path.join(os.path.expanduser("~"), ".cache", APP_NAME, "models")
+
+
+def _find_cached_model(model_name):
+    """在各缓存位置中查找已缓存的模型，返回缓存目录或 None"""
+    model_dir_name = model_name.replace("/", "_")
+    for cache_dir in _cache_candidates():
+        model_path = os.path.join(cache_dir, model_dir_name)
+        if os.path.exists(model_path):
+            logger.info(f"找到已缓存模型: {model_path}")
+            return cache_dir
+    return None
+
+
+def _cache_candidates():
+    """可能的模型缓存位置"""
     candidates = []
 
     # 1. 应用专属缓存目录
-    if sys.platform == "darwin":
-        app_cache = os.path.join(os.path.expanduser("~"), "Library", "Caches", APP_NAME, "models")
-    elif sys.platform == "win32":
-        app_cache = os.path.join(os.environ.get("LOCALAPPDATA", os.path.expanduser("~")), APP_NAME, "models")
-    else:
-        app_cache = os.path.join(os.path.expanduser("~"), ".cache", APP_NAME, "models")
-    candidates.append(app_cache)
+    candidates.append(_get_app_cache_dir())
 
     # 2. sentence-transformers 默认缓存
     st_cache = os.path.join(os.path.expanduser("~"), ".cache", "torch", "sentence_transformers")
@@ -47,35 +71,139 @@ def get_cache_dir():
     hf_cache = os.path.join(os.path.expanduser("~"), ".cache", "huggingface", "hub")
     candidates.append(hf_cache)
 
-    # 检查是否已有缓存的模型
-    model_dir_name = MODEL_NAME.replace("/", "_")
-    for cache_dir in candidates:
-        model_path = os.path.join(cache_dir, model_dir_name)
-        if os.path.exists(model_path):
-            logger.info(f"找到已缓存模型: {model_path}")
-            return cache_dir
+    return candidates
+
+
+def get_cache_dir(model_name=MODEL_NAME):
+    """获取模型缓存目录，检查多个可能的缓存位置"""
+    cached = _find_cached_model(model_name)
+    if cached:
+        return cached
 
     # 没有找到缓存，使用应用专属目录
+    app_cache = _get_app_cache_dir()
     os.makedirs(app_cache, exist_ok=True)
     logger.info(f"使用缓存目录: {app_cache}")
     return app_cache
 
 
-def load_model():
+def _registry_path():
+    return os.path.join(os.path.dirname(_get_app_cache_dir()), REGISTRY_FILE)
+
+
+def _read_registry():
+    path = _registry_path()
+    if not os.path.isfile(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_registry(registry):
+    path = _registry_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(registry, f, ensure_ascii=False, indent=2)
+
+
+def _find_local_builtin(model_name):
+    """内置模型的本地目录（EXE 内置或已缓存），找不到时返回 None"""
+    bundled = _get_bundled_model_path(model_name)
+    if bundled:
+        return bundled
+    cache_dir = _find_cached_model(model_name)
+    if cache_dir:
+        path = os.path.join(cache_dir, model_name.replace("/", "_"))
+        if os.path.isfile(os.path.join(path, "config.json")):
+            return path
+    return None
+
+
+def is_model_available(name):
+    """模型能否在本机使用（默认模型可在线下载，视为可用）"""
+    source = list_models().get(name)
+    if source is None:
+        return False
+    if name not in BUILTIN_MODELS:
+        return os.path.isdir(source)
+    return name == DEFAULT_MODEL or _find_local_builtin(source) is not None
+
+
+def list_models(available_only=False):
+    """返回所有可选模型：注册名 -> 模型来源（HuggingFace 模型名或本地目录）
+
+    Args:
+        available_only: 只返回本机可用的模型（见 is_model_available）
+    """
+    models = dict(BUILTIN_MODELS)
+    models.update(_read_registry())
+    if available_only:
+        models = {name: source for name, source in models.items() if is_model_available(name)}
+    return models
+
+
+def register_model(name, path):
+    """注册本地模型目录（如自行微调的 sentence-transformers 模型）"""
+    path = os.path.abspath(path)
+    if not os.path.isfile(os.path.join(path, "config.json")):
+        raise ValueError(f"不是有效的模型目录（缺少 config.json）: {path}")
+    if name in BUILTIN_MODELS:
+        raise ValueError(f"不能覆盖内置模型: {name}")
+    registry = _read_registry()
+    registry[name] = path
+    _write_registry(registry)
+    logger.info(f"已注册模型 {name}: {path}")
+
+
+def unregister_model(name):
+    """取消注册本地模型"""
+    registry = _read_registry()
+    if name not in registry:
+        raise ValueError(f"未注册的模型: {name}")
+    del registry[name]
+    _write_registry(registry)
+
+
+def resolve_model(name=None):
+    """解析模型注册名，返回 (本地目录, None) 或 (None, HuggingFace 模型名)
+
+    本地注册的模型直接使用其目录；内置模型依次查找 EXE 内置目录、各缓存位置，
+    只有默认模型在本地找不到时才返回 HuggingFace 模型名（在线下载）。
+    """
+    name = name or DEFAULT_MODEL
+    models = list_models()
+    if name not in models:
+        raise ValueError(f"未知模型: {name}（可选: {', '.join(models)}）")
+
+    source = models[name]
+    if name not in BUILTIN_MODELS:
+        if not os.path.isdir(source):
+            raise ValueError(f"模型 {name} 的目录不存在: {source}")
+        return source, None
+
+    local_path = _find_local_builtin(source)
+    if local_path:
+        return local_path, None
+    if name != DEFAULT_MODEL:
+        raise ValueError(f"模型 {name} 未内置且本机没有缓存（{source}）")
+    return None, source
+
+
+def load_model(name=None):
     """加载 sentence-transformers 模型（优先使用内置模型）"""
     from sentence_transformers import SentenceTransformer
 
-    # 优先使用打包在 EXE 内的模型
-    bundled = _get_bundled_model_path()
-    if bundled:
-        logger.info(f"正在从内置路径加载模型: {bundled}")
-        model = SentenceTransformer(bundled)
+    # 本地注册模型 / 打包在 EXE 内或已缓存的模型
+    local_path, model_name = resolve_model(name)
+    if local_path:
+        logger.info(f"正在从本地路径加载模型: {local_path}")
+        model = SentenceTransformer(local_path)
         logger.info("模型加载完成")
         return model
 
-    # 回退到缓存/在线下载
-    cache_dir = get_cache_dir()
-    logger.info(f"正在加载模型 {MODEL_NAME} ...")
-    model = SentenceTransformer(MODEL_NAME, cache_folder=cache_dir)
+    # 默认模型回退到在线下载
+    cache_dir = get_cache_dir(model_name)
+    logger.info(f"正在加载模型 {model_name} ...")
+    model = SentenceTransformer(model_name, cache_folder=cache_dir)
     logger.info("模型加载完成")
     return model
@@ -0,0 +1,335 @@
+"""结果存储 - 列式索引的匹配结果，支持百万行级别的即时筛选/排序/搜索
+
+行号（row_id）与 result_table 一致：A 表结果在前（按 A 表顺序），B 表未使用项在后。
+"""
+
+import threading
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .match_result import ItemArray, STATUS_LABELS, STATUS_B_UNUSED, STATUS_PENDING
+from .matcher import RESULT_HEADERS, is_multi_source, format_source
+
+# 排序键
+SORT_KEYS = ("row", "a", "b", "sim", "status")
+# 随增量结果变化的排序键（A 表文本不会变化）
+_MUTABLE_SORT_KEYS = ("b", "sim", "status")
+# 合成排序键的低 32 位为行号
+_ROW_MASK = np.uint64(0xFFFFFFFF)
+# 沿用旧排序时，变化的行超过 1/8 则改为重新排序
+_MERGE_MAX_FRACTION = 8
+
+
+class _TextIndex:
+    """一组去重字符串的搜索/排序索引：预先小写化的 Arrow 数组 + 惰性计算的排序名次"""
+
+    def __init__(self, items):
+        self.items = items
+        self._values = pa.array(items.values, type=pa.large_string())
+        lowered = pc.utf8_lower(self._values)
+        # 与 search_mask 中查询文本的处理一致：换行、制表符均视为空格
+        self.lower = pc.replace_substring_regex(lowered, "[\t\n]", " ")
+        self._rank = None
+        self._row_order = None
+        self._last_hits = (None, None)
+
+    def hits(self, query):
+        """每个唯一字符串是否包含 query，末尾多一个 False 供下标 -1（空）使用
+
+        唯一字符串不随增量结果变化，缓存最近一次查询（匹配进行中每批刷新只需按编码取值）。
+        """
+        if self._last_hits[0] != query:
+            hit = pc.match_substring(self.lower, query).to_numpy(zero_copy_only=False)
+            self._last_hits = (query, np.append(hit, False))
+        return self._last_hits[1]
+
+    def rank(self):
+        """唯一字符串按原文排序的名次（从 1 开始），下标 -1（空字符串）为 0"""
+        if self._rank is None:
+            order = pc.sort_indices(self._values).to_numpy()
+            rank = np.zeros(len(order) + 1, dtype=np.uint32)
+            rank[order] = np.arange(1, len(order) + 1, dtype=np.uint32)
+            self._rank = rank
+        return self._rank
+
+    def row_order(self):
+        """按本组字符串排列 items 各项（即 A 表各行）的稳定排序下标"""
+        if self._row_order is None:
+            rows = np.arange(len(self.items), dtype=np.uint64)
+            key = (self.rank()[self.items.codes].astype(np.uint64) << np.uint64(32)) | rows
+            self._row_order = (np.sort(key) & _ROW_MASK).astype(np.int32)
+        return self._row_order
+
+
+class ResultStore:
+    """列式匹配结果：状态编码、float32 相似度、预先小写化的搜索文本"""
+
+    def __init__(self, result, previous=None):
+        """previous: 之前的 ResultStore，A/B 项目相同时复用其文本索引及仍然有效的排序
+        （如改阈值、匹配完成）；其余排序在后台线程中预先计算
+        """
+        n_a = len(result.b_idx)
+        self._init_rows(
+            result, np.arange(n_a, dtype=np.int32), result.b_idx, result.sim, result.status, previous)
+        self._start_precompute(SORT_KEYS[1:], previous)
+
+    @classmethod
+    def pending(cls, result):
+        """匹配进行中：所有 A 表行先标记为"匹配中"，随后由 update_rows 逐批填入"""
+        store = cls.__new__(cls)
+        n_a = len(result["a_items"])
+        store._init_rows(
+            result,
+            np.arange(n_a, dtype=np.int32),
+            np.full(n_a, -1, dtype=np.int32),
+            np.zeros(n_a, dtype=np.float32),
+            np.full(n_a, STATUS_PENDING, dtype=np.uint8),
+        )
+        # 行内容随增量结果变化，只预先计算与之无关的 A 表文本排序
+        store._start_precompute(("a",))
+        return store
+
+    def _init_rows(self, result, a_idx, b_idx, sim, status, previous=None):
+        """由 A 表各行的 (a_idx, b_idx, sim, status) 及 B 表未使用项建立各列"""
+        self.result = result
+        unmatched_b_indices = np.asarray(result.get("unmatched_b_indices", []), dtype=np.int32)
+        a_items = ItemArray.from_list(result["a_items"])
+        b_items = ItemArray.from_list(result["b_items"])
+        n_a = len(a_idx)
+        n = n_a + len(unmatched_b_indices)
+        self.n_a = n_a
+        self.n = n
+
+        # 搜索文本在建立时一次性小写化（按唯一字符串），之后搜索与增量更新都不再重建
+        self._a_index = self._reuse_index(previous, "_a_index", a_items) or _TextIndex(a_items)
+        self._b_index = self._reuse_index(previous, "_b_index", b_items) or _TextIndex(b_items)
+        self._a_values = a_items.values
+        self._b_values = b_items.values
+        self._b_items = b_items
+
+        self.a_idx = np.full(n, -1, dtype=np.int32)
+        self.b_idx = np.full(n, -1, dtype=np.int32)
+        self.a_idx[:n_a] = a_idx
+        self.b_idx[:n_a] = b_idx
+        self.b_idx[n_a:] = unmatched_b_indices
+
+        # 每行对应的唯一字符串编码，-1 映射为末尾的空位（显示时取空字符串）
+        self._a_code = self._row_codes(a_items, self.a_idx)
+        self._b_code = self._row_codes(b_items, self.b_idx)
+
+        self.sim = np.zeros(n, dtype=np.float32)
+        self.sim[:n_a] = sim
+
+        self.status = np.full(n, STATUS_B_UNUSED, dtype=np.uint8)
+        self.status[:n_a] = status
+
+        self.a_provenance = result.get("a_provenance")
+        self.b_provenance = result.get("b_provenance")
+        self.show_source = is_multi_source(self.a_provenance) or is_multi_source(self.b_provenance)
+        self.headers = list(RESULT_HEADERS)
+        if self.show_source:
+            self.headers += ["A来源", "B来源"]
+
+        # 编辑与 result 共享，导出/保存会话时直接生效
+        self.edits = result.setdefault("edits", {})
+
+        # 排序缓存可能由后台线程写入；只有匹配进行中的 store 会修改行内容，
+        # 而它只在后台预先计算 A 表文本排序（与行内容无关）
+        self._sort_cache = {}
+        self._sort_lock = threading.Lock()
+
+    def _carry_orders(self, previous):
+        """沿用 previous 中已缓存的排序：保留未变化的 A 表行，只合并变化的行和 B 表未使用项
+
+        变化的行较多时合并不比重新排序快，此时不沿用。
+        """
+        if previous._a_index is not self._a_index or previous._b_index is not self._b_index:
+            return
+        n_a = self.n_a
+        dirty = np.zeros(previous.n, dtype=bool)
+        dirty[n_a:] = True
+        dirty[:n_a] = (
+            (previous.b_idx[:n_a] != self.b_idx[:n_a])
+            | (previous.sim[:n_a] != self.sim[:n_a])
+            | (previous.status[:n_a] != self.status[:n_a])
+        )
+        rows = np.concatenate([np.flatnonzero(dirty[:n_a]), np.arange(n_a, self.n)]).astype(np.int32)
+        if len(rows) > self.n // _MERGE_MAX_FRACTION:
+            return
+        with previous._sort_lock:
+            cached = {key: previous._sort_cache[key] for key in _MUTABLE_SORT_KEYS if key in previous._sort_cache}
+        for key, order in cached.items():
+            order = self._merge_rows(key, order[~dirty[order]], rows)
+            with self._sort_lock:
+                self._sort_cache.setdefault(key, order)
+
+    def _merge_rows(self, key, kept, rows):
+        """把 rows 按排序键插入已排好序的 kept（kept 中各行的排序键未变化）"""
+        new = np.sort(self._composite_key(key, rows))
+        pos = np.searchsorted(self._composite_key(key, kept), new)
+        return np.insert(kept, pos, (new & _ROW_MASK).astype(np.int32))
+
+    def _start_precompute(self, keys, previous=None):
+        """后台线程沿用 previous 的排序并预先计算其余排序（numpy 排序期间释放 GIL，不阻塞界面）
+
+        界面在后台完成前请求某个排序时直接同步计算，结果以先写入者为准。
+        """
+        def work():
+            if previous is not None:
+                self._carry_orders(previous)
+            for key in keys:
+                self._sort_order(key)
+
+        threading.Thread(target=work, daemon=True).start()
+
+    @staticmethod
+    def _reuse_index(previous, attr, items):
+        index = getattr(previous, attr, None) if previous is not None else None
+        return index if index is not None and index.items is items else None
+
+    @staticmethod
+    def _row_codes(items, indices):
+        codes = np.append(items.codes, len(items.values)).astype(np.int32)
+        return codes[indices]
+
+    def update_rows(self, a_idx, b_idx, sim, status):
+        """填入一批 A 表行的匹配结果（行号即 A 表下标）
+
+        搜索索引按唯一字符串建立，只需更新这些行的编码；已缓存的排序只合并变化的行。
+        """
+        a_idx = np.asarray(a_idx, dtype=np.int32)
+        with self._sort_lock:
+            changed = {key: self._sort_cache.pop(key) for key in _MUTABLE_SORT_KEYS if key in self._sort_cache}
+        if changed:
+            keep = np.ones(self.n, dtype=bool)
+            keep[a_idx] = False
+            changed = {key: order[keep[order]] for key, order in changed.items()}
+
+        self.b_idx[a_idx] = b_idx
+        self._b_code[a_idx] = self._row_codes(self._b_items, b_idx)
+        self.sim[a_idx] = sim
+        self.status[a_idx] = status
+
+        for key, kept in changed.items():
+            order = self._merge_rows(key, kept, a_idx)
+            with self._sort_lock:
+                self._sort_cache[key] = order
+
+    def counts(self):
+        """每种状态的行数"""
+        return np.bincount(self.status, minlength=len(STATUS_LABELS))
+
+    def search_mask(self, query):
+        """返回 A/B 文本包含 query（不区分大小写）的行掩码"""
+        query = query.lower().replace("\n", " ").replace("\t", " ")
+        if not query:
+            return np.ones(self.n, dtype=bool)
+        return self._a_index.hits(query)[self._a_code] | self._b_index.hits(query)[self._b_code]
+
+    def _composite_key(self, key, rows):
+        """(排序键, 行号) 合成的 uint64，按它排序即等价于按排序键稳定排序"""
+        if key == "a":
+            k = self._a_index.rank()[self._a_code[rows]]
+        elif key == "b":
+            k = self._b_index.rank()[self._b_code[rows]]
+        elif key == "sim":
+            # float32 按位映射为保序的 uint32
+            bits = self.sim[rows].view(np.uint32)
+            k = np.where(bits >> 31, ~bits, bits | np.uint32(0x80000000))
+        elif key == "status":
+            k = self.status[rows]
+        else:
+            raise ValueError(f"未知排序键: {key}")
+        return (k.astype(np.uint64) << np.uint64(32)) | rows.astype(np.uint64)
+
+    def _sort_order(self, key):
+        with self._sort_lock:
+            order = self._sort_cache.get(key)
+        if order is not None:
+            return order
+
+        if key == "row":
+            order = np.arange(self.n, dtype=np.int32)
+        elif key == "a":
+            # B 表未使用项的 A 文本为空，排在最前；A 表各行的顺序只取决于 A 表项目，可在各 store 间共用
+            order = np.concatenate([
+                np.arange(self.n_a, self.n, dtype=np.int32), self._a_index.row_order(),
+            ])
+        else:
+            rows = np.arange(self.n, dtype=np.int32)
+            order = (np.sort(self._composite_key(key, rows)) & _ROW_MASK).astype(np.int32)
+        with self._sort_lock:
+            return self._sort_cache.setdefault(key, order)
+
+    def query(self, statuses=None, sim_min=None, sim_max=None, search="",
+              sort_key="row", descending=False):
+        """筛选 + 搜索 + 排序，返回 row_id 数组（int32）
+
+        Args:
+            statuses: 保留的状态编码集合，None 表示全部
+            sim_min / sim_max: 相似度范围（闭区间），None 表示不限
+            search: 搜索文本（A/B 项目，不区分大小写）
+            sort_key: SORT_KEYS 之一
+            descending: 是否降序
+        """
+        mask = np.ones(self.n, dtype=bool)
+        if statuses is not None:
+            mask &= np.isin(self.status, np.fromiter(statuses, dtype=np.uint8))
+        if sim_min is not None:
+            mask &= self.sim >= sim_min
+        if sim_max is not None:
+            mask &= self.sim <= sim_max
+        if search:
+            mask &= self.search_mask(search)
+
+        order = self._sort_order(sort_key)
+        if descending:
+            order = order[::-1]
+        return order[mask[order]]
+
+    @staticmethod
+    def _text(values, code):
+        return values[code] if code < len(values) else ""
+
+    def base_row(self, row_id):
+        """未应用编辑的显示行"""
+        sim = float(self.sim[row_id])
+        row = [
+            self._text(self._a_values, self._a_code[row_id]),
+            self._text(self._b_values, self._b_code[row_id]),
+            f"{sim:.3f}" if sim > 0 else "",
+            STATUS_LABELS[self.status[row_id]],
+        ]
+        if self.show_source:
+            a_idx = self.a_idx[row_id]
+            b_idx = self.b_idx[row_id]
+            row.append(format_source(self.a_provenance, a_idx) if a_idx >= 0 else "")
+            row.append(format_source(self.b_provenance, b_idx) if b_idx >= 0 else "")
+        return row
+
+    def display_row(self, row_id):
+        """应用用户编辑后的显示行"""
+        row = self.base_row(row_id)
+        if self.edits:
+            for col in range(len(row)):
+                value = self.edits.get((int(row_id), col))
+                if value is not None:
+                    row[col] = value
+        return row
+
+    def update_edits(self, row_ids, rows):
+        """把一页显示数据与原始行对比，更新这些行的编辑记录"""
+        for row_id, current in zip(row_ids, rows):
+            if row_id < 0:
+                continue
+            row_id = int(row_id)
+            base = self.base_row(row_id)
+            for col in range(len(base)):
+                value = current[col] if col < len(current) else ""
+                value = "" if value is None else str(value)
+                if value != base[col]:
+                    self.edits[(row_id, col)] = value
+                else:
+                    self.edits.pop((row_id, col), None)
@@ -0,0 +1,301 @@
+"""会话快照 - 以 Parquet + npy 保存/加载匹配结果，无需重新编码即可重新打开
+
+会话为一个目录（默认扩展名 .vlps）：
+    session.json        元数据（版本、阈值、输入文件、来源表）
+    a_items.parquet     A 表项目（text, source, row）
+    b_items.parquet     B 表项目（text, source, row）
+    matches.parquet     按 A 表顺序的匹配结果（a_idx, b_idx, similarity, status）
+    unmatched_b.parquet B 表未使用项（b_idx）
+    edits.parquet       用户编辑（row, col, value）
+    scoring.parquet     精确匹配与不设阈值的 AI 贪心配对（kind, a_idx, b_idx, similarity），
+                        用于重新设置阈值
+    embeddings/<模型>/  AI 匹配所用向量及其下标（a, a_indices, b, b_indices .npy），
+                        按模型分目录存放，加载时以内存映射方式打开
+"""
+
+import os
+import gc
+import json
+import time
+import shutil
+import atexit
+import logging
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .model_manager import DEFAULT_MODEL
+from .match_result import MatchResult, ItemArray, STATUS_LABELS
+
+logger = logging.getLogger(__name__)
+
+SESSION_VERSION = 1
+SESSION_EXT = ".vlps"
+META_FILE = "session.json"
+EMBEDDING_KEYS = ("a", "a_indices", "b", "b_indices")
+# 匹配过程中临时存放向量的目录前缀；超过该时长的残留目录在下次写入时清理
+SPILL_PREFIX = "vlookup_emb_"
+SPILL_MAX_AGE = 24 * 3600
+
+
+def _embedding_dir(session_path, model):
+    """向量按模型分目录存放"""
+    safe = model.replace("/", "_").replace("\\", "_")
+    return os.path.join(session_path, "embeddings", safe)
+
+
+def _items_frame(items, provenance):
+    # 以字典编码（categorical）写入，重复文本只存一份
+    return pd.DataFrame({
+        "text": pd.Categorical.from_codes(items.codes, categories=pd.Index(items.values, dtype=object)),
+        "source": provenance["source"].astype(np.int32),
+        "row": provenance["row"].astype(np.int32),
+    })
+
+
+def _read_items(path):
+    df = pd.read_parquet(path)
+    text = df["text"]
+    items = ItemArray(text.cat.categories.to_numpy(dtype=object), text.cat.codes.to_numpy())
+    source = df["source"].to_numpy(dtype=np.int32)
+    row = df["row"].to_numpy(dtype=np.int32)
+    return items, source, row
+
+
+def _cleanup_spills(keep=None):
+    """删除过期的临时向量目录（其他进程可能仍在使用较新的目录）"""
+    root = tempfile.gettempdir()
+    now = time.time()
+    for name in os.listdir(root):
+        full = os.path.join(root, name)
+        if not name.startswith(SPILL_PREFIX) or full == keep:
+            continue
+        try:
+            if now - os.path.getmtime(full) > SPILL_MAX_AGE:
+                shutil.rmtree(full, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def spill_embeddings(embeddings):
+    """把向量写入临时 npy 文件并以内存映射方式重新打开，不再常驻内存
+
+    结果只在保存会话时读取向量；以内存映射持有可避免百万行级别时占用数 GB 内存。
+    临时目录在进程退出时删除（Windows 上仍被映射时由下次运行清理）。
+    """
+    spill_dir = tempfile.mkdtemp(prefix=SPILL_PREFIX)
+    _cleanup_spills(keep=spill_dir)
+    spilled = {}
+    for key in EMBEDDING_KEYS:
+        file = os.path.join(spill_dir, f"{key}.npy")
+        np.save(file, np.ascontiguousarray(embeddings[key]))
+        spilled[key] = np.load(file, mmap_mode="r")
+    atexit.register(shutil.rmtree, spill_dir, ignore_errors=True)
+    return spilled
+
+
+def session_dir(path):
+    """接受会话目录或其中的 session.json，返回会话目录"""
+    if os.path.basename(path) == META_FILE:
+        return os.path.dirname(path)
+    return path
+
+
+def save_session(result, path, extra_meta=None):
+    """保存匹配结果为会话目录
+
+    Args:
+        result: run_match 返回的 MatchResult
+        path: 会话目录路径（不存在时自动添加 .vlps 扩展名）
+        extra_meta: 额外写入 session.json 的元数据
+
+    Returns:
+        实际写入的会话目录
+    """
+    path = session_dir(path)
+    if not path.endswith(SESSION_EXT) and not os.path.isdir(path):
+        path += SESSION_EXT
+    if os.path.exists(path) and not os.path.isfile(os.path.join(path, META_FILE)):
+        raise ValueError(f"目标已存在且不是会话目录: {path}")
+
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        shutil.rmtree(tmp)
+    os.makedirs(tmp)
+
+    _items_frame(result["a_items"], result["a_provenance"]).to_parquet(
+        os.path.join(tmp, "a_items.parquet"), index=False)
+    _items_frame(result["b_items"], result["b_provenance"]).to_parquet(
+        os.path.join(tmp, "b_items.parquet"), index=False)
+
+    n_a = len(result.b_idx)
+    pd.DataFrame({
+        "a_idx": np.arange(n_a, dtype=np.int32),
+        "b_idx": result.b_idx,
+        "similarity": result.sim,
+        "status": pd.Categorical.from_codes(result.status, categories=STATUS_LABELS),
+    }).to_parquet(os.path.join(tmp, "matches.parquet"), index=False)
+
+    pd.DataFrame({
+        "b_idx": result.unmatched_b_idx,
+    }).to_parquet(os.path.join(tmp, "unmatched_b.parquet"), index=False)
+
+    edits = result.get("edits", {})
+    pd.DataFrame({
+        "row": np.array([k[0] for k in edits], dtype=np.int32),
+        "col": np.array([k[1] for k in edits], dtype=np.int32),
+        "value": pd.Series(list(edits.values()), dtype=object),
+    }).to_parquet(os.path.join(tmp, "edits.parquet"), index=False)
+
+    scoring = result.get("scoring")
+    if scoring is not None:
+        n_exact = len(scoring["exact_a"])
+        n_fuzzy = len(scoring["fuzzy_a"])
+        pd.DataFrame({
+            "kind": np.concatenate([np.zeros(n_exact, dtype=np.uint8), np.ones(n_fuzzy, dtype=np.uint8)]),
+            "a_idx": np.concatenate([scoring["exact_a"], scoring["fuzzy_a"]]).astype(np.int32),
+            "b_idx": np.concatenate([scoring["exact_b"], scoring["fuzzy_b"]]).astype(np.int32),
+            "similarity": np.concatenate([
+                np.ones(n_exact, dtype=np.float32), scoring["fuzzy_sim"],
+            ]).astype(np.float32),
+        }).to_parquet(os.path.join(tmp, "scoring.parquet"), index=False)
+
+    model = result.get("model") or DEFAULT_MODEL
+    embeddings = result.get("embeddings")
+    if embeddings is not None:
+        emb_dir = _embedding_dir(tmp, model)
+        os.makedirs(emb_dir)
+        for key in EMBEDDING_KEYS:
+            np.save(os.path.join(emb_dir, f"{key}.npy"), np.ascontiguousarray(embeddings[key]))
+
+    meta = {
+        "version": SESSION_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "threshold": result.get("threshold"),
+        "model": model,
+        "a_sources": [list(s) for s in result["a_provenance"]["sources"]],
+        "b_sources": [list(s) for s in result["b_provenance"]["sources"]],
+        "has_embeddings": embeddings is not None,
+        "candidate_floor": scoring["floor"] if scoring is not None else None,
+        "candidate_capped": scoring.get("capped", 0) if scoring is not None else 0,
+    }
+    if extra_meta:
+        meta.update(extra_meta)
+    with open(os.path.join(tmp, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    # 覆盖当前打开的会话时，向量仍映射着旧目录中的文件，Windows 上无法删除：
+    # 先释放映射，替换完成后再从新目录重新映射（原地更新，共享该 dict 的结果一并生效）
+    remap = _maps_under(embeddings, path)
+    if remap:
+        for key in EMBEDDING_KEYS:
+            embeddings[key] = None
+        gc.collect()
+    try:
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.rename(tmp, path)
+    finally:
+        if remap:
+            base = path if os.path.isdir(_embedding_dir(path, model)) else tmp
+            emb_dir = _embedding_dir(base, model)
+            for key in EMBEDDING_KEYS:
+                embeddings[key] = np.load(os.path.join(emb_dir, f"{key}.npy"), mmap_mode="r")
+    logger.info(f"会话已保存: {path}")
+    return path
+
+
+def _maps_under(embeddings, path):
+    """向量中是否有映射自 path 目录下文件的数组"""
+    if embeddings is None:
+        return False
+    root = os.path.join(os.path.abspath(path), "")
+    for key in EMBEDDING_KEYS:
+        filename = getattr(embeddings[key], "filename", None)
+        if filename and os.path.abspath(filename).startswith(root):
+            return True
+    return False
+
+
+def load_session(path, mmap=True):
+    """加载会话目录，返回与 run_match 相同的 MatchResult
+
+    Args:
+        path: 会话目录或其中的 session.json
+        mmap: 是否以内存映射方式打开向量文件
+    """
+    path = session_dir(path)
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.isfile(meta_path):
+        raise ValueError(f"不是有效的会话目录: {path}")
+
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("version") != SESSION_VERSION:
+        raise ValueError(f"不支持的会话版本: {meta.get('version')}")
+
+    a_items, a_source, a_row = _read_items(os.path.join(path, "a_items.parquet"))
+    b_items, b_source, b_row = _read_items(os.path.join(path, "b_items.parquet"))
+
+    # matches.parquet 按 A 表顺序存放，a_idx 即行号
+    df = pd.read_parquet(os.path.join(path, "matches.parquet"))
+    b_idx = df["b_idx"].to_numpy(dtype=np.int32)
+    sim = df["similarity"].to_numpy(dtype=np.float32)
+    status_cat = df["status"].astype("category")
+    code_map = np.array([STATUS_LABELS.index(c) for c in status_cat.cat.categories], dtype=np.uint8)
+    status = code_map[status_cat.cat.codes.to_numpy()]
+
+    unmatched_b_idx = pd.read_parquet(
+        os.path.join(path, "unmatched_b.parquet"))["b_idx"].to_numpy(dtype=np.int32)
+
+    edits_df = pd.read_parquet(os.path.join(path, "edits.parquet"))
+    edits = {
+        (int(r), int(c)): v
+        for r, c, v in zip(edits_df["row"], edits_df["col"], edits_df["value"])
+    }
+
+    scoring = None
+    scoring_path = os.path.join(path, "scoring.parquet")
+    if os.path.isfile(scoring_path):
+        sdf = pd.read_parquet(scoring_path)
+        exact = (sdf["kind"] == 0).to_numpy()
+        fuzzy = ~exact
+        scoring = {
+            "exact_a": sdf["a_idx"].to_numpy(dtype=np.int32)[exact],
+            "exact_b": sdf["b_idx"].to_numpy(dtype=np.int32)[exact],
+            "fuzzy_a": sdf["a_idx"].to_numpy(dtype=np.int32)[fuzzy],
+            "fuzzy_b": sdf["b_idx"].to_numpy(dtype=np.int32)[fuzzy],
+            "fuzzy_sim": sdf["similarity"].to_numpy(dtype=np.float32)[fuzzy],
+            "floor": meta["candidate_floor"],
+            "capped": meta["candidate_capped"],
+        }
+
+    model = meta["model"]
+    embeddings = None
+    if meta["has_embeddings"]:
+        emb_dir = _embedding_dir(path, model)
+        embeddings = {
+            key: np.load(os.path.join(emb_dir, f"{key}.npy"), mmap_mode="r" if mmap else None)
+            for key in EMBEDDING_KEYS
+        }
+
+    return MatchResult(
+        a_items, b_items, b_idx, sim, status, unmatched_b_idx,
+        a_provenance={
+            "sources": [tuple(s) for s in meta["a_sources"]],
+            "source": a_source,
+            "row": a_row,
+        },
+        b_provenance={
+            "sources": [tuple(s) for s in meta["b_sources"]],
+            "source": b_source,
+            "row": b_row,
+        },
+        embeddings=embeddings,
+        scoring=scoring,
+        threshold=meta.get("threshold"),
+        model=model,
+        edits=edits,
+    )
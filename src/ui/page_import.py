@@ -6,13 +6,18 @@ import queue
 import customtkinter as ctk
 from tkinter import filedialog, messagebox, StringVar
 
+from ..core.matcher import resolve_files
+from ..core.model_manager import DEFAULT_MODEL, list_models
+
 
 class PageImport(ctk.CTkFrame):
-    def __init__(self, master, state, show_page):
+    def __init__(self, master, state, show_page, get_page):
         super().__init__(master)
         self.state = state
         self.show_page = show_page
+        self.get_page = get_page
         self._msg_queue = queue.Queue()
+        self._running = False
         self.configure(fg_color="transparent")
 
         self._last_dir = os.path.expanduser("~")
@@ -73,6 +78,32 @@ class PageImport(ctk.CTkFrame):
             command=lambda: self._pick_file(self._file_b_var, "b"),
         ).pack(side="right", padx=10)
 
+        # --- 工作表选择 ---
+        sheets_frame = ctk.CTkFrame(content)
+        sheets_frame.pack(fill="x", pady=10)
+
+        ctk.CTkLabel(
+            sheets_frame, text="工作表：",
+            font=ctk.CTkFont(size=14), width=160, anchor="w",
+        ).pack(side="left", padx=10)
+
+        ctk.CTkLabel(sheets_frame, text="A", font=ctk.CTkFont(size=13)).pack(side="left", padx=(5, 2))
+        self._sheets_a_var = StringVar(value="")
+        ctk.CTkEntry(
+            sheets_frame, width=120, textvariable=self._sheets_a_var,
+        ).pack(side="left", padx=5)
+
+        ctk.CTkLabel(sheets_frame, text="B", font=ctk.CTkFont(size=13)).pack(side="left", padx=(10, 2))
+        self._sheets_b_var = StringVar(value="")
+        ctk.CTkEntry(
+            sheets_frame, width=120, textvariable=self._sheets_b_var,
+        ).pack(side="left", padx=5)
+
+        ctk.CTkLabel(
+            sheets_frame, text="留空 = 第一个工作表，* = 全部，多个名称用逗号分隔",
+            font=ctk.CTkFont(size=12), text_color="gray",
+        ).pack(side="left", padx=10)
+
         # --- 阈值 ---
         threshold_frame = ctk.CTkFrame(content)
         threshold_frame.pack(fill="x", pady=10)
@@ -92,6 +123,26 @@ class PageImport(ctk.CTkFrame):
             font=ctk.CTkFont(size=12), text_color="gray",
         ).pack(side="left", padx=10)
 
+        # --- 模型 ---
+        model_frame = ctk.CTkFrame(content)
+        model_frame.pack(fill="x", pady=10)
+
+        ctk.CTkLabel(
+            model_frame, text="AI 模型：",
+            font=ctk.CTkFont(size=14), width=160, anchor="w",
+        ).pack(side="left", padx=10)
+
+        self._model_var = StringVar(value=DEFAULT_MODEL)
+        ctk.CTkOptionMenu(
+            model_frame, width=200, variable=self._model_var,
+            values=list(list_models(available_only=True)),
+        ).pack(side="left", padx=5)
+
+        ctk.CTkLabel(
+            model_frame, text="bge-small-zh 更快；自定义模型可用命令行 models --register 注册",
+            font=ctk.CTkFont(size=12), text_color="gray",
+        ).pack(side="left", padx=10)
+
         # --- 开始匹配按钮 ---
         self._match_btn = ctk.CTkButton(
             content,
@@ -102,6 +153,17 @@ class PageImport(ctk.CTkFrame):
         )
         self._match_btn.pack(pady=(30, 10), fill="x")
 
+        self._open_session_btn = ctk.CTkButton(
+            content,
+            text="打开已保存的会话",
+            height=32,
+            fg_color="transparent",
+            border_width=1,
+            text_color=("gray10", "gray90"),
+            command=self._on_open_session,
+        )
+        self._open_session_btn.pack(pady=(0, 10), fill="x")
+
         # --- 进度区域（初始隐藏）---
         self._progress_frame = ctk.CTkFrame(content)
 
@@ -115,16 +177,41 @@ class PageImport(ctk.CTkFrame):
         self._progress_bar.pack(fill="x", padx=20, pady=(0, 10))
 
     def _pick_file(self, string_var, key):
-        """打开文件选择对话框"""
-        path = filedialog.askopenfilename(
+        """打开文件选择对话框（可多选，多个文件以 ; 分隔）"""
+        paths = filedialog.askopenfilenames(
             title="选择 Excel 文件",
             filetypes=[("Excel 文件", "*.xlsx *.xls"), ("所有文件", "*.*")],
             initialdir=self._last_dir,
         )
-        if path:
-            string_var.set(path)
-            self.state[f"file_{key}"] = path
-            self._last_dir = os.path.dirname(path)
+        if paths:
+            value = ";".join(paths)
+            string_var.set(value)
+            self.state[f"file_{key}"] = value
+            self._last_dir = os.path.dirname(paths[0])
+
+    def _on_open_session(self):
+        """打开会话快照，直接进入结果页"""
+        if self._running:
+            messagebox.showinfo("提示", "匹配仍在进行中，请等待完成")
+            return
+
+        path = filedialog.askopenfilename(
+            title="选择会话（会话目录中的 session.json）",
+            filetypes=[("VLookup Pro 会话", "session.json"), ("所有文件", "*.*")],
+            initialdir=self._last_dir,
+        )
+        if not path:
+            return
+
+        try:
+            from ..core.session import load_session
+            self.state["result"] = load_session(path)
+        except Exception as e:
+            messagebox.showerror("打开失败", f"打开会话时出错:\n{str(e)}")
+            return
+
+        self._last_dir = os.path.dirname(os.path.dirname(path))
+        self.show_page("result")
 
     def _validate(self):
         """验证输入"""
@@ -137,12 +224,19 @@ class PageImport(ctk.CTkFrame):
         if not self.state["file_b"]:
             messagebox.showwarning("提示", "请选择 Excel B 文件")
             return False
-        if not os.path.isfile(self.state["file_a"]):
-            messagebox.showerror("错误", f"文件不存在: {self.state['file_a']}")
-            return False
-        if not os.path.isfile(self.state["file_b"]):
-            messagebox.showerror("错误", f"文件不存在: {self.state['file_b']}")
-            return False
+        for key in ("file_a", "file_b"):
+            files = resolve_files(self.state[key])
+            if not files:
+                messagebox.showerror("错误", f"没有找到匹配的文件: {self.state[key]}")
+                return False
+            for path in files:
+                if not os.path.isfile(path):
+                    messagebox.showerror("错误", f"文件不存在: {path}")
+                    return False
+
+        self.state["sheets_a"] = self._sheets_a_var.get().strip() or None
+        self.state["sheets_b"] = self._sheets_b_var.get().strip() or None
+        self.state["model"] = self._model_var.get()
 
         try:
             val = float(self._threshold_var.get())
@@ -160,6 +254,8 @@ class PageImport(ctk.CTkFrame):
         if not self._validate():
             return
 
+        self.state["result"] = None
+        self._running = True
         self._match_btn.configure(state="disabled")
         self._progress_label.configure(text="正在准备...")
         self._progress_frame.pack(pady=(10, 0), fill="x")
@@ -172,21 +268,55 @@ class PageImport(ctk.CTkFrame):
         """线程安全：把进度消息放入队列"""
         self._msg_queue.put(("progress", message))
 
+    def _send_partial(self, event):
+        """线程安全：把增量结果事件放入队列"""
+        self._msg_queue.put((event["type"], event))
+
     def _poll_queue(self):
-        """主线程轮询队列"""
+        """主线程轮询队列：每次取出全部消息，进度只显示最新一条，增量行合并后一次刷新"""
+        progress = None
+        begin = None
+        rows = []
+        final = None
         try:
             while True:
                 msg_type, payload = self._msg_queue.get_nowait()
                 if msg_type == "progress":
-                    self._progress_label.configure(text=payload)
-                elif msg_type == "done":
-                    self._on_match_complete()
-                    return
-                elif msg_type == "error":
-                    self._on_match_error(payload)
-                    return
+                    progress = payload
+                elif msg_type == "begin":
+                    begin = payload
+                elif msg_type == "rows":
+                    rows.append(payload)
+                elif msg_type in ("done", "error"):
+                    final = (msg_type, payload)
+                    break
         except queue.Empty:
             pass
+
+        result_page = self.get_page("result")
+        if progress is not None:
+            self._progress_label.configure(text=progress)
+            result_page.set_progress(progress)
+        if begin is not None:
+            # 读取完成后立即打开结果页，精确匹配结果随后到达
+            result_page.begin_stream({
+                "a_items": begin["a_items"],
+                "b_items": begin["b_items"],
+                "a_provenance": begin["a_provenance"],
+                "b_provenance": begin["b_provenance"],
+                "edits": {},
+            })
+            self.show_page("result")
+        if rows:
+            result_page.append_rows(rows)
+
+        if final is not None:
+            msg_type, payload = final
+            if msg_type == "done":
+                self._on_match_complete(payload)
+            else:
+                self._on_match_error(payload)
+            return
         self.after(100, self._poll_queue)
 
     def _run_match_thread(self):
@@ -199,22 +329,31 @@ class PageImport(ctk.CTkFrame):
                 self.state["file_b"],
                 threshold=self.state["threshold"],
                 progress_callback=self._send_progress,
+                sheets_a=self.state.get("sheets_a"),
+                sheets_b=self.state.get("sheets_b"),
+                model_name=self.state.get("model"),
+                partial_callback=self._send_partial,
             )
-            self.state["result"] = result
-            self._msg_queue.put(("done", None))
+            self._msg_queue.put(("done", result))
         except Exception as e:
             self._msg_queue.put(("error", str(e)))
 
-    def _on_match_complete(self):
+    def _on_match_complete(self, result):
         """匹配完成"""
+        self._running = False
         self._progress_bar.stop()
         self._progress_frame.pack_forget()
         self._match_btn.configure(state="normal")
+        self.state["result"] = result
+        self.get_page("result").finish_stream(result)
         self.show_page("result")
 
     def _on_match_error(self, error_msg):
         """匹配出错"""
+        self._running = False
         self._progress_bar.stop()
         self._progress_frame.pack_forget()
         self._match_btn.configure(state="normal")
+        self.get_page("result").abort_stream()
+        self.show_page("import")
         messagebox.showerror("匹配失败", f"匹配过程中出错:\n{error_msg}")
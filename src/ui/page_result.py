@@ -1,11 +1,17 @@
-"""界面2：tksheet 结果表 + 导出"""
+"""界面2：tksheet 结果表（筛选/排序/搜索/分页）+ 导出"""
 
 import sys
 import customtkinter as ctk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, StringVar, BooleanVar
 
 from tksheet import Sheet
-import pandas as pd
+
+from ..core.matcher import separator_row, export_result, rethreshold, threshold_sweep
+from ..core.match_result import (
+    STATUS_LABELS, STATUS_EXACT, STATUS_FUZZY, STATUS_UNMATCHED, STATUS_B_UNUSED, STATUS_PENDING,
+)
+from ..core.result_store import ResultStore
+from ..core.session import SESSION_EXT, save_session
 
 
 # 行颜色定义
@@ -13,8 +19,25 @@ COLOR_EXACT = "#C8E6C9"      # 绿色 - 精确匹配
 COLOR_FUZZY = "#FFE0B2"      # 橙色 - 模糊匹配
 COLOR_UNMATCHED = "#FFCDD2"  # 粉色 - 未匹配
 COLOR_B_UNUSED = "#E0E0E0"   # 灰色 - B表未使用
+COLOR_PENDING = "#FFFFFF"    # 白色 - 匹配中
 COLOR_SEPARATOR = "#BDBDBD"  # 分隔行
 
+# 状态编码 -> 行颜色
+STATUS_COLORS = (COLOR_EXACT, COLOR_FUZZY, COLOR_UNMATCHED, COLOR_B_UNUSED, COLOR_PENDING)
+
+# 每页显示行数（筛选/排序在全量数据上进行，只渲染当前页）
+PAGE_SIZE = 1000
+
+# 排序选项：(显示名称, 排序键, 是否降序)
+SORT_OPTIONS = (
+    ("原始顺序", "row", False),
+    ("相似度 ↓", "sim", True),
+    ("相似度 ↑", "sim", False),
+    ("A表项目", "a", False),
+    ("B表项目", "b", False),
+    ("匹配状态", "status", False),
+)
+
 
 class PageResult(ctk.CTkFrame):
     def __init__(self, master, state, show_page):
@@ -22,6 +45,13 @@ class PageResult(ctk.CTkFrame):
         self.state = state
         self.show_page = show_page
         self.sheet = None
+        self.store = None
+        self._view = None
+        self._page = 0
+        self._row_ids = []
+        self._show_separator = True
+        self._filter_job = None
+        self._streaming = False
 
         # 平台相关字体和行高（参考 word_table_filler_v0.2）
         if sys.platform == 'win32':
@@ -47,11 +77,19 @@ class PageResult(ctk.CTkFrame):
         )
         self._stats_label.pack(side="left", padx=10)
 
+        self._progress_label = ctk.CTkLabel(
+            toolbar,
+            text="",
+            font=ctk.CTkFont(size=12),
+            text_color="gray",
+        )
+        self._progress_label.pack(side="left", padx=10)
+
         back_btn = ctk.CTkButton(
             toolbar,
             text="返回",
             width=80,
-            command=lambda: self.show_page("import"),
+            command=self._on_back,
         )
         back_btn.pack(side="right", padx=(5, 10))
 
@@ -63,6 +101,14 @@ class PageResult(ctk.CTkFrame):
         )
         export_btn.pack(side="right", padx=5)
 
+        save_btn = ctk.CTkButton(
+            toolbar,
+            text="保存会话",
+            width=100,
+            command=self._on_save_session,
+        )
+        save_btn.pack(side="right", padx=5)
+
         # 颜色图例栏
         legend_frame = ctk.CTkFrame(self, fg_color="transparent")
         legend_frame.pack(fill="x", padx=15, pady=(0, 5))
@@ -83,73 +129,142 @@ class PageResult(ctk.CTkFrame):
 
             ctk.CTkLabel(chip, text=text, font=ctk.CTkFont(size=12)).pack(side="left")
 
+        # 筛选栏
+        filter_frame = ctk.CTkFrame(self, fg_color="transparent")
+        filter_frame.pack(fill="x", padx=15, pady=(0, 5))
+
+        self._status_vars = []
+        for label in STATUS_LABELS:
+            var = BooleanVar(value=True)
+            ctk.CTkCheckBox(
+                filter_frame, text=label, variable=var, width=20,
+                command=self._on_filter_changed,
+            ).pack(side="left", padx=(0, 10))
+            self._status_vars.append(var)
+
+        ctk.CTkLabel(filter_frame, text="相似度", font=ctk.CTkFont(size=12)).pack(side="left", padx=(10, 4))
+        self._sim_min_var = StringVar(value="")
+        self._sim_max_var = StringVar(value="")
+        sim_min_entry = ctk.CTkEntry(filter_frame, width=60, textvariable=self._sim_min_var)
+        sim_min_entry.pack(side="left")
+        ctk.CTkLabel(filter_frame, text="~", font=ctk.CTkFont(size=12)).pack(side="left", padx=3)
+        sim_max_entry = ctk.CTkEntry(filter_frame, width=60, textvariable=self._sim_max_var)
+        sim_max_entry.pack(side="left")
+
+        ctk.CTkLabel(filter_frame, text="搜索", font=ctk.CTkFont(size=12)).pack(side="left", padx=(15, 4))
+        self._search_var = StringVar(value="")
+        search_entry = ctk.CTkEntry(filter_frame, width=200, textvariable=self._search_var)
+        search_entry.pack(side="left")
+
+        for entry in (sim_min_entry, sim_max_entry, search_entry):
+            entry.bind("<KeyRelease>", lambda e: self._schedule_filter())
+
+        self._sort_var = StringVar(value=SORT_OPTIONS[0][0])
+        ctk.CTkOptionMenu(
+            filter_frame, width=130, variable=self._sort_var,
+            values=[name for name, _, _ in SORT_OPTIONS],
+            command=lambda _: self._on_filter_changed(),
+        ).pack(side="right")
+        ctk.CTkLabel(filter_frame, text="排序", font=ctk.CTkFont(size=12)).pack(side="right", padx=4)
+
+        # 翻页栏
+        pager = ctk.CTkFrame(self, fg_color="transparent")
+        pager.pack(side="bottom", fill="x", padx=15, pady=(0, 10))
+
+        # 阈值调整（只重做配对，不重新编码）
+        ctk.CTkLabel(pager, text="阈值", font=ctk.CTkFont(size=12)).pack(side="left", padx=(0, 4))
+        self._threshold_var = StringVar(value="")
+        threshold_entry = ctk.CTkEntry(pager, width=60, textvariable=self._threshold_var)
+        threshold_entry.pack(side="left")
+        threshold_entry.bind("<Return>", lambda e: self._on_apply_threshold())
+        ctk.CTkButton(pager, text="应用", width=60, command=self._on_apply_threshold).pack(side="left", padx=5)
+        ctk.CTkButton(pager, text="阈值分析", width=80, command=self._on_threshold_sweep).pack(side="left")
+
+        ctk.CTkButton(pager, text="下一页", width=80, command=lambda: self._goto_page(self._page + 1)).pack(side="right")
+        self._page_label = ctk.CTkLabel(pager, text="", font=ctk.CTkFont(size=12))
+        self._page_label.pack(side="right", padx=10)
+        ctk.CTkButton(pager, text="上一页", width=80, command=lambda: self._goto_page(self._page - 1)).pack(side="right")
+
         # tksheet 表格容器
         self._sheet_frame = ctk.CTkFrame(self, fg_color="transparent")
-        self._sheet_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        self._sheet_frame.pack(fill="both", expand=True, padx=10, pady=(0, 5))
 
     def on_show(self):
         """页面显示时刷新数据"""
         result = self.state.get("result")
         if result is None:
             return
-        self._populate_sheet(result)
+        if self.store is None or self.store.result is not result:
+            self._populate_sheet(result)
+
+    def _populate_sheet(self, result, keep_page=False):
+        """为新结果建立索引并创建 tksheet（A/B 项目不变时复用文本索引）"""
+        self._set_store(ResultStore(result, previous=self.store), keep_page)
+
+    def begin_stream(self, result):
+        """匹配开始：先显示全部 A 表行（匹配中），随后增量填入结果"""
+        self._streaming = True
+        self._set_store(ResultStore.pending(result))
+
+    def append_rows(self, events):
+        """填入一批或多批增量结果（主线程调用）"""
+        if self.store is None or not self._streaming:
+            return
+        self._collect_edits()
+        for event in events:
+            self.store.update_rows(event["a_idx"], event["b_idx"], event["sim"], event["status"])
+        self._update_stats()
+        self._apply_filter(keep_page=True)
+
+    def finish_stream(self, result):
+        """匹配完成：用最终结果替换，保留匹配过程中已做的编辑"""
+        if self.store is not None:
+            self._collect_edits()
+            # 行号即 A 表下标，过程中只可能编辑 A 表行
+            result["edits"].update(self.store.edits)
+        self._streaming = False
+        self.set_progress("")
+        self._populate_sheet(result, keep_page=True)
+
+    def abort_stream(self):
+        """匹配失败：停止增量刷新"""
+        self._streaming = False
+        self.set_progress("")
+
+    def set_progress(self, message):
+        self._progress_label.configure(text=message)
+
+    def _update_stats(self):
+        counts = self.store.counts()
+        result = self.store.result
+        text = (
+            f"A表: {len(result['a_items'])} 项  |  "
+            f"B表: {len(result['b_items'])} 项  |  "
+            f"精确: {counts[STATUS_EXACT]}  模糊: {counts[STATUS_FUZZY]}  "
+            f"未匹配: {counts[STATUS_UNMATCHED]}  B表未使用: {counts[STATUS_B_UNUSED]}"
+        )
+        if counts[STATUS_PENDING]:
+            text += f"  匹配中: {counts[STATUS_PENDING]}"
+        self._stats_label.configure(text=text)
 
-    def _populate_sheet(self, result):
-        """填充 tksheet 数据"""
+    def _set_store(self, store, keep_page=False):
         # 如果已有 sheet 则销毁重建
         if self.sheet is not None:
             self.sheet.destroy()
 
-        matches = result["matches"]
-        unmatched_b = result["unmatched_b"]
-
-        # 构建表格数据
-        headers = ["A表项目", "B表匹配项", "相似度", "匹配状态"]
-        data = []
-        row_colors = []
-
-        # 统计
-        n_exact = 0
-        n_fuzzy = 0
-        n_unmatched = 0
-
-        for a_text, b_text, sim, status in matches:
-            sim_str = f"{sim:.3f}" if sim > 0 else ""
-            data.append([a_text, b_text, sim_str, status])
-            if status == "精确匹配":
-                row_colors.append(COLOR_EXACT)
-                n_exact += 1
-            elif status == "模糊匹配":
-                row_colors.append(COLOR_FUZZY)
-                n_fuzzy += 1
-            else:
-                row_colors.append(COLOR_UNMATCHED)
-                n_unmatched += 1
-
-        # 分隔行
-        if unmatched_b:
-            data.append(["━" * 10, "━" * 10, "", ""])
-            row_colors.append(COLOR_SEPARATOR)
-
-            # B 表未使用项
-            for b_text in unmatched_b:
-                data.append(["", b_text, "", "B表未使用"])
-                row_colors.append(COLOR_B_UNUSED)
+        self.store = store
+        headers = self.store.headers
+        result = store.result
+        if result.get("threshold") is not None:
+            self._threshold_var.set(f"{result['threshold']:.2f}")
 
         # 更新统计信息
-        self._stats_label.configure(
-            text=(
-                f"A表: {len(result['a_items'])} 项  |  "
-                f"B表: {len(result['b_items'])} 项  |  "
-                f"精确: {n_exact}  模糊: {n_fuzzy}  "
-                f"未匹配: {n_unmatched}  B表未使用: {len(unmatched_b)}"
-            )
-        )
+        self._update_stats()
 
         # 创建 tksheet（参考 word_table_filler_v0.2 的配置方式）
         self.sheet = Sheet(
             self._sheet_frame,
-            data=data,
+            data=[],
             headers=headers,
             show_row_index=True,
             row_index_width=50,
@@ -165,11 +280,17 @@ class PageResult(ctk.CTkFrame):
             self.sheet.column_width(column=1, width=500)
             self.sheet.column_width(column=2, width=140)
             self.sheet.column_width(column=3, width=160)
+            if self.store.show_source:
+                self.sheet.column_width(column=4, width=300)
+                self.sheet.column_width(column=5, width=300)
         else:
             self.sheet.column_width(column=0, width=350)
             self.sheet.column_width(column=1, width=350)
             self.sheet.column_width(column=2, width=100)
             self.sheet.column_width(column=3, width=120)
+            if self.store.show_source:
+                self.sheet.column_width(column=4, width=200)
+                self.sheet.column_width(column=5, width=200)
 
         # 启用编辑和快捷键
         self.sheet.enable_bindings((
@@ -188,15 +309,159 @@ class PageResult(ctk.CTkFrame):
             "arrowkeys",
         ))
 
-        # 设置行颜色
-        for row_idx, color in enumerate(row_colors):
-            self.sheet.highlight_rows(rows=[row_idx], bg=color)
+        self._row_ids = []
+        self._apply_filter(keep_page)
+
+    def _schedule_filter(self):
+        """输入时防抖，停止输入 150ms 后再筛选"""
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(150, self._on_filter_changed)
+
+    def _on_filter_changed(self):
+        self._filter_job = None
+        if self.store is None:
+            return
+        self._collect_edits()
+        self._apply_filter()
+
+    def _parse_sim(self, var):
+        try:
+            text = var.get().strip()
+            return float(text) if text else None
+        except ValueError:
+            return None
+
+    def _apply_filter(self, keep_page=False):
+        """按当前筛选条件重新计算视图，默认回到第一页"""
+        statuses = {code for code, var in enumerate(self._status_vars) if var.get()}
+        _, sort_key, descending = next(
+            opt for opt in SORT_OPTIONS if opt[0] == self._sort_var.get()
+        )
+        self._view = self.store.query(
+            statuses=statuses,
+            sim_min=self._parse_sim(self._sim_min_var),
+            sim_max=self._parse_sim(self._sim_max_var),
+            search=self._search_var.get().strip(),
+            sort_key=sort_key,
+            descending=descending,
+        )
+        self._show_separator = sort_key == "row" and not descending
+        n_pages = max(1, -(-len(self._view) // PAGE_SIZE))
+        self._page = min(self._page, n_pages - 1) if keep_page else 0
+        self._render_page()
+
+    def _goto_page(self, page):
+        if self.store is None:
+            return
+        n_pages = max(1, -(-len(self._view) // PAGE_SIZE))
+        page = min(max(page, 0), n_pages - 1)
+        if page == self._page:
+            return
+        self._collect_edits()
+        self._page = page
+        self._render_page()
+
+    def _render_page(self):
+        """把当前页的行写入 tksheet"""
+        n_view = len(self._view)
+        n_pages = max(1, -(-n_view // PAGE_SIZE))
+        page_ids = self._view[self._page * PAGE_SIZE:(self._page + 1) * PAGE_SIZE]
+
+        width = len(self.store.headers)
+        data = []
+        row_ids = []
+        color_rows = {}
+        for row_id in page_ids.tolist():
+            if self._show_separator and row_id == self.store.n_a:
+                color_rows.setdefault(COLOR_SEPARATOR, []).append(len(data))
+                data.append(separator_row(width))
+                row_ids.append(-1)
+            color_rows.setdefault(STATUS_COLORS[self.store.status[row_id]], []).append(len(data))
+            data.append(self.store.display_row(row_id))
+            row_ids.append(row_id)
+        self._row_ids = row_ids
+
+        self.sheet.set_sheet_data(data, reset_col_positions=False, redraw=False)
+        self.sheet.dehighlight_all(redraw=False)
+        # 按颜色批量设置行背景
+        for color, rows in color_rows.items():
+            self.sheet.highlight_rows(rows=rows, bg=color, redraw=False)
+        self.sheet.refresh()
+
+        self._page_label.configure(
+            text=f"第 {self._page + 1}/{n_pages} 页  |  筛选结果 {n_view} 行"
+        )
+
+    def _on_apply_threshold(self):
+        """在新阈值下重新配对，刷新结果"""
+        if self.store is None or self._check_streaming():
+            return
+        try:
+            val = float(self._threshold_var.get())
+            if not (0 <= val <= 1):
+                raise ValueError
+        except ValueError:
+            messagebox.showwarning("提示", "阈值必须是 0~1 之间的数字")
+            return
+
+        self._collect_edits()
+        try:
+            result = rethreshold(self.store.result, val)
+        except ValueError as e:
+            messagebox.showwarning("提示", str(e))
+            return
+
+        self.state["threshold"] = val
+        self.state["result"] = result
+        self._populate_sheet(result)
+
+    def _on_threshold_sweep(self):
+        """显示各阈值下的匹配数统计"""
+        if self.store is None or self._check_streaming():
+            return
+        try:
+            sweep = threshold_sweep(self.store.result)
+        except ValueError as e:
+            messagebox.showwarning("提示", str(e))
+            return
+
+        lines = ["阈值      模糊匹配    未匹配"]
+        for t, n_fuzzy, n_unmatched in zip(sweep["thresholds"], sweep["fuzzy"], sweep["unmatched"]):
+            lines.append(f"{t:.2f}    {n_fuzzy:>8}  {n_unmatched:>8}")
+        lines.append("")
+        lines.append("相似度分布（AI 配对）")
+        edges = sweep["hist_edges"]
+        for i, count in enumerate(sweep["hist_counts"]):
+            lines.append(f"{edges[i]:.2f} ~ {edges[i + 1]:.2f}    {count:>8}")
+
+        dialog = ctk.CTkToplevel(self)
+        dialog.title("阈值分析")
+        dialog.geometry("360x480")
+        textbox = ctk.CTkTextbox(dialog, font=ctk.CTkFont(family="Courier", size=12))
+        textbox.pack(fill="both", expand=True, padx=10, pady=10)
+        textbox.insert("1.0", "\n".join(lines))
+        textbox.configure(state="disabled")
+        dialog.transient(self.winfo_toplevel())
+
+    def _check_streaming(self):
+        """匹配进行中时提示并返回 True"""
+        if self._streaming:
+            messagebox.showinfo("提示", "匹配仍在进行中，请等待完成")
+        return self._streaming
+
+    def _on_back(self):
+        """返回导入页（保留已做的编辑）"""
+        self._collect_edits()
+        self.show_page("import")
 
     def _on_export(self):
         """导出 Excel"""
-        if self.sheet is None:
+        if self.store is None:
             messagebox.showwarning("提示", "没有数据可导出")
             return
+        if self._check_streaming():
+            return
 
         path = filedialog.asksaveasfilename(
             title="导出结果",
@@ -208,12 +473,38 @@ class PageResult(ctk.CTkFrame):
             return
 
         try:
-            # 从 sheet 读取当前数据（可能已被编辑）
-            sheet_data = self.sheet.get_sheet_data()
-            headers = self.sheet.headers()
-
-            df = pd.DataFrame(sheet_data, columns=headers)
-            df.to_excel(path, index=False, engine="openpyxl")
+            self._collect_edits()
+            export_result(self.store.result, path)
             messagebox.showinfo("成功", f"已导出到:\n{path}")
         except Exception as e:
             messagebox.showerror("导出失败", f"导出时出错:\n{str(e)}")
+
+    def _on_save_session(self):
+        """保存会话快照（含编辑和向量），可在导入页重新打开"""
+        if self.store is None:
+            messagebox.showwarning("提示", "没有数据可保存")
+            return
+        if self._check_streaming():
+            return
+
+        path = filedialog.asksaveasfilename(
+            title="保存会话",
+            defaultextension=SESSION_EXT,
+            filetypes=[("VLookup Pro 会话", f"*{SESSION_EXT}")],
+            initialfile=f"vlookup_session{SESSION_EXT}",
+        )
+        if not path:
+            return
+
+        try:
+            self._collect_edits()
+            path = save_session(self.store.result, path)
+            messagebox.showinfo("成功", f"会话已保存到:\n{path}")
+        except Exception as e:
+            messagebox.showerror("保存失败", f"保存会话时出错:\n{str(e)}")
+
+    def _collect_edits(self):
+        """把当前页的用户编辑写回结果（result["edits"]，按 row_id 记录）"""
+        if self.sheet is None or not self._row_ids:
+            return
+        self.store.update_edits(self._row_ids, self.sheet.get_sheet_data())
@@ -0,0 +1,92 @@
+"""AI 匹配候选打分与贪心配对的回归测试"""
+
+import numpy as np
+import pytest
+
+from src.core.ai_matcher import (
+    candidate_floor,
+    cut_at_threshold,
+    greedy_assign,
+    score_candidates,
+)
+
+
+def _vectors(n, dim, rng, low=-2, high=3):
+    """小整数向量：点积精确无舍入误差，且有大量并列分数，便于检验并列时的顺序"""
+    return rng.integers(low, high, size=(n, dim)).astype(np.float32)
+
+
+def _full_greedy(vectors_a, vectors_b, threshold):
+    """参照实现：完整相似度矩阵上按阈值做贪心一对一配对"""
+    sim = np.dot(vectors_a, vectors_b.T)
+    rows, cols = np.nonzero(sim >= np.float32(threshold))
+    scores = sim[rows, cols]
+    order = np.argsort(-scores, kind="stable")
+    used_a, used_b, pairs = set(), set(), []
+    for r, c, s in zip(rows[order], cols[order], scores[order]):
+        if r in used_a or c in used_b:
+            continue
+        used_a.add(r)
+        used_b.add(c)
+        pairs.append((int(r), int(c), float(s)))
+    return pairs
+
+
+@pytest.mark.parametrize("n_a,n_b", [(120, 90), (90, 120)])
+def test_threshold_cut_is_prefix_of_full_greedy(n_a, n_b):
+    rng = np.random.default_rng(0)
+    va = _vectors(n_a, 6, rng)
+    vb = _vectors(n_b, 6, rng)
+
+    rows, cols, scores, capped = score_candidates(va, vb, floor=-100, chunk_size=7)
+    assert capped == 0
+    assert len(scores) == n_a * n_b
+    assert np.all(np.diff(scores) <= 0)
+    accepted = greedy_assign(rows, cols, scores, n_a, n_b)
+    assert len(accepted[0]) == min(n_a, n_b)
+
+    for threshold in (-100, 0, 3, 6, 9, 12):
+        n = cut_at_threshold(accepted[2], threshold)
+        got = list(zip(accepted[0][:n].tolist(), accepted[1][:n].tolist(), accepted[2][:n].tolist()))
+        assert got == _full_greedy(va, vb, threshold)
+
+
+def test_floor_keeps_prefix_above_floor():
+    rng = np.random.default_rng(1)
+    va = _vectors(80, 6, rng)
+    vb = _vectors(70, 6, rng)
+    floor = 4
+
+    rows, cols, scores, _ = score_candidates(va, vb, floor=floor, chunk_size=9)
+    assert scores.min() >= floor
+    accepted = greedy_assign(rows, cols, scores, 80, 70)
+    for t in (floor, 6, 9):
+        n = cut_at_threshold(accepted[2], t)
+        got = list(zip(accepted[0][:n].tolist(), accepted[1][:n].tolist(), accepted[2][:n].tolist()))
+        assert got == _full_greedy(va, vb, t)
+
+
+def test_candidate_floor_bounds():
+    assert candidate_floor(0.85) == pytest.approx(0.75)
+    assert candidate_floor(0.05) == 0.0
+    assert candidate_floor(0.8, floor=0.9) == pytest.approx(0.8)
+    assert candidate_floor(0.8, floor=0.3) == pytest.approx(0.3)
+
+
+def test_greedy_stops_when_all_matched():
+    rows = np.array([0, 1, 0, 1], dtype=np.int32)
+    cols = np.array([0, 1, 1, 0], dtype=np.int32)
+    scores = np.array([0.9, 0.8, 0.7, 0.6], dtype=np.float32)
+    r, c, s = greedy_assign(rows, cols, scores, 2, 5)
+    assert r.tolist() == [0, 1]
+    assert c.tolist() == [0, 1]
+
+
+def test_top_k_reports_capped_rows():
+    rng = np.random.default_rng(2)
+    va = _vectors(20, 6, rng, low=1, high=3)
+    vb = _vectors(20, 6, rng, low=1, high=3)
+    rows, cols, scores, capped = score_candidates(va, vb, floor=1, top_k=3, chunk_size=6)
+    assert capped == 20
+    assert np.bincount(rows, minlength=20).max() <= 3
+    assert np.all(np.diff(scores) <= 0)